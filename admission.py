@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """클라이언트별 토큰 버킷 (초당 rate 개 충전, 최대 burst 개)
+
+    추적하는 클라이언트 수는 max_clients 로 제한하고, 가장 오래 안 보인 클라이언트부터 잊는다.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client → [tokens, last refill time]
+        self._lock = threading.Lock()
+
+    def allow(self, client, now=None):
+        now = now or time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            return False
+
+
+class ConcurrencyLimit:
+    """동시에 실행 중인 작업 수 제한 (대기하지 않고 바로 거절)"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._sem = threading.BoundedSemaphore(limit)
+
+    def try_acquire(self):
+        return self._sem.acquire(blocking=False)
+
+    def release(self):
+        self._sem.release()
@@ -0,0 +1,118 @@
+"""정적 파일/페이지 캐싱
+
+- static/ 의 파일은 시작 시 내용 해시로 지문을 붙인 이름(js/yacht_game.<hash>.js)을 만들고,
+  템플릿에서는 {{ asset_url('js/yacht_game.js') }} 로 참조한다.
+  지문 URL 은 내용이 바뀌면 URL 도 바뀌므로 1년 immutable 캐시를 건다.
+- 요청에 의존하지 않는 템플릿은 프로세스당 한 번만 렌더링한다.
+- 둘 다 gzip(과 brotli 모듈이 있으면 br) 압축본을 미리 만들어 두고 Accept-Encoding 에 맞춰 보낸다.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, abort, render_template, request
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'  # 캐시는 하되 매번 ETag 로 재검증
+COMPRESS_MIN = 512  # 이보다 작은 파일은 압축하지 않음
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'image/x-icon',
+                'image/vnd.microsoft.icon')
+ETAG_SUFFIX = {'identity': '', 'gzip': '-gz', 'br': '-br'}
+
+
+class _Encoded:
+    """본문과 미리 압축한 변형들"""
+    __slots__ = ('variants', 'mimetype', 'etag')
+
+    def __init__(self, body, mimetype):
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {'identity': body}
+        if len(body) >= COMPRESS_MIN and mimetype.startswith(COMPRESSIBLE):
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body)
+
+    def response(self, cache_control):
+        offered = [e for e in ('br', 'gzip', 'identity') if e in self.variants]
+        encoding = request.accept_encodings.best_match(offered, default='identity')
+        # 인코딩마다 바이트가 다르므로 강한 ETag 도 따로 (identity 는 지문과 같은 해시)
+        etag = self.etag + ETAG_SUFFIX[encoding]
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            resp = Response(self.variants[encoding], content_type=self.mimetype)
+            if encoding != 'identity':
+                resp.headers['Content-Encoding'] = encoding
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = cache_control
+        if len(self.variants) > 1:
+            resp.vary.add('Accept-Encoding')
+        return resp
+
+
+class StaticAssets:
+    def __init__(self, folder):
+        self.folder = folder
+        self._by_url = {}        # 요청 이름 → (_Encoded, immutable 여부)
+        self._fingerprints = {}  # 원래 이름 → 지문 이름
+        self.build()
+
+    def build(self):
+        by_url, fingerprints = {}, {}
+        for root, _, files in os.walk(self.folder):
+            for fname in files:
+                path = os.path.join(root, fname)
+                name = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    body = f.read()
+                mimetype = mimetypes.guess_type(fname)[0] or 'application/octet-stream'
+                if mimetype.startswith('text/') or mimetype == 'application/javascript':
+                    mimetype += '; charset=utf-8'
+                encoded = _Encoded(body, mimetype)
+                stem, ext = os.path.splitext(name)
+                hashed = f'{stem}.{encoded.etag[:12]}{ext}'
+                by_url[name] = (encoded, False)
+                by_url[hashed] = (encoded, True)
+                fingerprints[name] = hashed
+        self._by_url, self._fingerprints = by_url, fingerprints
+
+    def url(self, name):
+        """템플릿용: 지문이 붙은 /static/ URL"""
+        return '/static/' + self._fingerprints.get(name, name)
+
+    def serve(self, filename):
+        entry = self._by_url.get(filename)
+        if entry is None:
+            abort(404)
+        encoded, immutable = entry
+        return encoded.response(IMMUTABLE if immutable else REVALIDATE)
+
+    def init_app(self, app):
+        app.add_url_rule('/static/<path:filename>', 'static', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+
+
+class PageCache:
+    """요청과 무관한 템플릿을 프로세스당 한 번만 렌더링해 압축본과 함께 보관"""
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def serve(self, template):
+        page = self._pages.get(template)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(template)
+                if page is None:
+                    body = render_template(template).encode('utf-8')
+                    page = self._pages[template] = _Encoded(body, 'text/html; charset=utf-8')
+        return page.response(REVALIDATE)
@@ -1,97 +1,244 @@
+import argparse
 import json
 import os
+import sys
+import time
 from datetime import datetime
 
-DATA_FILE = 'game_data.json'
+import leaderboards
+import metrics
+
+DATA_FILE = 'game_data.json'                # 집계 (사용자/싱글/상대 전적/리더보드)
+WINDOWS_FILE = 'leaderboard_windows.json'   # 기간별 리더보드 조회용 (구간마다 상위 TOP_K 개만)
+HISTORY_FILE = 'game_history.jsonl'         # 경기 기록 (추가 전용, rebuild/check 만 읽음)
+
+DB_SECONDS = metrics.histogram('yacht_db_op_seconds', 'database load_data/save_data duration', ('op',))
+DB_BYTES = metrics.counter('yacht_db_bytes_total', 'bytes read/written by load_data/save_data', ('op',))
 
 def load_data():
     """게임 데이터 로드"""
     if not os.path.exists(DATA_FILE):
         # 싱글/멀티 분리 구조로 초기화
-        return {'users': {}, 'games': [], 'single_leaderboard': []}
+        return _empty_data()
     try:
-        data = json.load(open(DATA_FILE, 'r', encoding='utf-8'))
-        # 마이그레이션: single_leaderboard 필드가 없으면 추가
-        if 'single_leaderboard' not in data:
-            data['single_leaderboard'] = []
-        return data
+        start = time.perf_counter()
+        with open(DATA_FILE, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        DB_SECONDS.observe(time.perf_counter() - start, 'load')
+        DB_BYTES.inc('load', amount=len(raw))
     except:
-        return {'users': {}, 'games': [], 'single_leaderboard': []}
+        return _empty_data()
+    # 마이그레이션: single_leaderboard 필드가 없으면 추가
+    if 'single_leaderboard' not in data:
+        data['single_leaderboard'] = []
+    if 'games' in data or 'single_games' in data or 'head_to_head' not in data or 'windows' not in data:
+        # 이전 형식은 한 번만 변환해 바로 저장
+        data = _migrate(data)
+        save_data(data)
+    return data
+
+_view_cache = (None, {})  # (WINDOWS_FILE stat 키, 파싱한 조회용 리더보드)
+
+def _windows_view():
+    """조회용 기간별 리더보드 (game_data.json 은 읽지 않음, 파일이 그대로면 파싱해 둔 것을 재사용)"""
+    global _view_cache
+    try:
+        st = os.stat(WINDOWS_FILE)
+    except FileNotFoundError:
+        if not os.path.exists(DATA_FILE):
+            return {}
+        save_data(load_data())  # 이 파일이 생기기 전 데이터: 한 번 만들어 둠
+        st = os.stat(WINDOWS_FILE)
+    # 저장은 항상 새 파일로 교체하므로 inode/mtime/크기가 같으면 내용도 같음 (다른 프로세스가 저장해도 감지)
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached_key, view = _view_cache
+    if key != cached_key:
+        try:
+            with open(WINDOWS_FILE, 'rb') as f:
+                view = json.loads(f.read())
+        except (OSError, ValueError):
+            view = {}
+        _view_cache = (key, view)
+    return view
+
+def _migrate(data):
+    """기록을 HISTORY_FILE 로 옮기고, 집계 필드가 없던 데이터면 기록으로 한 번 계산"""
+    games = single_games = None  # None: 기록은 이미 HISTORY_FILE 에 있음
+    if 'games' in data or 'single_games' in data:
+        games = data.pop('games', [])
+        single_games = data.pop('single_games', None)
+        if single_games is None:
+            # 이전 싱글 기록은 상위 20개만 남아 있음
+            single_games = list(data['single_leaderboard'])
+        if os.path.exists(HISTORY_FILE) and os.path.getsize(HISTORY_FILE):
+            # 변환 도중 중단됐던 경우: 이미 옮겨진 기록 파일을 그대로 씀
+            games, single_games = load_history()
+        else:
+            _write_history(games, single_games)
+    if 'head_to_head' not in data or 'windows' not in data:
+        data = rebuild_stats(dict(data, single_stats={}, head_to_head={}, windows={}), games, single_games)
+    return data
 
 def save_data(data):
-    """게임 데이터 저장"""
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """게임 데이터 저장 (기간별 리더보드 조회용 상위 목록은 WINDOWS_FILE 로 따로)"""
+    start = time.perf_counter()
+    raw = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    with open(DATA_FILE, 'wb') as f:
+        f.write(raw)
+    view = json.dumps(leaderboards.top_view(data.get('windows', {})), ensure_ascii=False).encode('utf-8')
+    tmp = WINDOWS_FILE + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(view)
+    os.replace(tmp, WINDOWS_FILE)
+    DB_SECONDS.observe(time.perf_counter() - start, 'save')
+    DB_BYTES.inc('save', amount=len(raw) + len(view))
 
-def get_or_create_user(username):
-    """사용자 생성/조회"""
-    data = load_data()
-    if username not in data['users']:
-        data['users'][username] = {
+def _history_line(kind, record):
+    return json.dumps(dict(record, kind=kind), ensure_ascii=False) + '\n'
+
+def append_history(kind, record):
+    """경기 기록 한 줄 추가 (kind: 'multi'/'single'), 집계 파일은 건드리지 않음"""
+    with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+        f.write(_history_line(kind, record))
+
+def _write_history(games, single_games):
+    tmp = HISTORY_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.writelines(_history_line('multi', g) for g in games)
+        f.writelines(_history_line('single', g) for g in single_games)
+    os.replace(tmp, HISTORY_FILE)
+
+def load_history():
+    """기록 파일 전체 → (멀티 기록, 싱글 기록) (rebuild/check 전용, 쓰다 끊긴 줄은 건너뜀)"""
+    games, single_games = [], []
+    if not os.path.exists(HISTORY_FILE):
+        return games, single_games
+    with open(HISTORY_FILE, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            (single_games if record.pop('kind', None) == 'single' else games).append(record)
+    return games, single_games
+
+RECENT_GAMES = 10  # 최근 전적으로 보관하는 경기 수
+
+def _empty_data():
+    return {'users': {}, 'single_leaderboard': [], 'single_stats': {}, 'head_to_head': {}, 'windows': {}}
+
+def _ensure_user(data, username, created_at=None):
+    """data 안의 사용자 레코드 (없으면 생성, 누락 필드 보정)"""
+    user = data['users'].get(username)
+    if user is None:
+        user = data['users'][username] = {
             'username': username,
             'wins': 0,
             'draws': 0,
             'losses': 0,
             'total_score': 0,
             'games_played': 0,
-            'created_at': datetime.now().isoformat()
+            'created_at': created_at or datetime.now().isoformat()
         }
-        save_data(data)
+    return _user_defaults(user)
+
+def _user_defaults(user):
+    """스키마 업그레이드: 누락 필드를 보정"""
+    user.setdefault('draws', 0)
+    user.setdefault('best_score', None)
+    user.setdefault('current_streak', 0)  # 양수: 연승, 음수: 연패, 무승부면 0
+    user.setdefault('best_win_streak', 0)
+    user.setdefault('recent', [])         # 최근 RECENT_GAMES 경기 'W'/'D'/'L' (오래된 것부터)
+    user.setdefault('last_played', None)
+    return user
+
+def _record_result(user, score, result, timestamp):
+    """사용자 한 명의 집계 갱신 (result: 'W'/'D'/'L')"""
+    user[{'W': 'wins', 'D': 'draws', 'L': 'losses'}[result]] += 1
+    user['total_score'] += score
+    user['games_played'] += 1
+    if user['best_score'] is None or score > user['best_score']:
+        user['best_score'] = score
+    if result == 'W':
+        user['current_streak'] = max(user['current_streak'], 0) + 1
+        user['best_win_streak'] = max(user['best_win_streak'], user['current_streak'])
+    elif result == 'L':
+        user['current_streak'] = min(user['current_streak'], 0) - 1
     else:
-        # 스키마 업그레이드: 누락 필드를 보정
-        data['users'][username].setdefault('draws', 0)
-        save_data(data)
-    return data['users'][username]
+        user['current_streak'] = 0
+    user['recent'].append(result)
+    del user['recent'][:-RECENT_GAMES]
+    user['last_played'] = timestamp
 
-def save_game_result(player1_name, player1_score, player2_name, player2_score):
-    """게임 결과 저장"""
-    data = load_data()
-    
-    # 플레이어 정보 확인/생성
-    get_or_create_user(player1_name)
-    if player2_name:
-        get_or_create_user(player2_name)
-    # 안전하게 필드 보정 (기존 데이터 호환)
-    data['users'][player1_name].setdefault('draws', 0)
-    if player2_name:
-        data['users'][player2_name].setdefault('draws', 0)
-    
+def _record_head_to_head(data, name, opponent, result):
+    row = data['head_to_head'].setdefault(name, {}).setdefault(opponent, {'wins': 0, 'draws': 0, 'losses': 0})
+    row[{'W': 'wins', 'D': 'draws', 'L': 'losses'}[result]] += 1
+
+def _apply_game(data, player1_name, player1_score, player2_name, player2_score, timestamp):
+    """멀티 게임 한 판을 사용자 집계/상대 전적에 반영 (save_game_result 와 rebuild_stats 공용)"""
+    p1 = _ensure_user(data, player1_name, timestamp)
     # 승무패 결정
     if player2_name and player1_score == player2_score:
-        data['users'][player1_name]['draws'] += 1
-        data['users'][player2_name]['draws'] += 1
+        r1, r2 = 'D', 'D'
     elif player1_score > player2_score or not player2_name:
-        data['users'][player1_name]['wins'] += 1
-        if player2_name:
-            data['users'][player2_name]['losses'] += 1
+        r1, r2 = 'W', 'L'
     else:
-        data['users'][player1_name]['losses'] += 1
-        if player2_name:
-            data['users'][player2_name]['wins'] += 1
-    
-    # 통계 업데이트
-    data['users'][player1_name]['total_score'] += player1_score
-    data['users'][player1_name]['games_played'] += 1
-    
+        r1, r2 = 'L', 'W'
+    _record_result(p1, player1_score, r1, timestamp)
+    results = [(player1_name, player1_score, r1)]
     if player2_name:
-        data['users'][player2_name]['total_score'] += player2_score
-        data['users'][player2_name]['games_played'] += 1
+        p2 = _ensure_user(data, player2_name, timestamp)
+        _record_result(p2, player2_score, r2, timestamp)
+        _record_head_to_head(data, player1_name, player2_name, r1)
+        _record_head_to_head(data, player2_name, player1_name, r2)
+        results.append((player2_name, player2_score, r2))
+    if timestamp:
+        leaderboards.record_multi(data['windows'], results, datetime.fromisoformat(timestamp))
+    return p1
+
+def _apply_single(data, username, score, timestamp):
+    stats = data['single_stats'].setdefault(username, {'games': 0, 'total_score': 0, 'best_score': None,
+                                                       'last_played': None})
+    stats['games'] += 1
+    stats['total_score'] += score
+    if stats['best_score'] is None or score > stats['best_score']:
+        stats['best_score'] = score
+    stats['last_played'] = timestamp
+    if timestamp:
+        entry = {'username': username, 'score': score, 'timestamp': timestamp}
+        leaderboards.record_single(data['windows'], entry, datetime.fromisoformat(timestamp))
+
+def get_or_create_user(username):
+    """사용자 생성/조회"""
+    data = load_data()
+    user = _ensure_user(data, username)
+    save_data(data)
+    return user
+
+def save_game_result(player1_name, player1_score, player2_name, player2_score):
+    """게임 결과 저장 (사용자 집계/상대 전적도 함께 갱신)"""
+    data = load_data()
+    timestamp = datetime.now().isoformat()
+    user = _apply_game(data, player1_name, player1_score, player2_name, player2_score, timestamp)
     
     # 게임 기록 저장
-    data['games'].append({
+    append_history('multi', {
         'player1': player1_name,
         'score1': player1_score,
         'player2': player2_name,
         'score2': player2_score,
         'winner': player1_name if (player1_score > player2_score if player2_name else True) else (player2_name or 'N/A'),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': timestamp
     })
     
     save_data(data)
-    return data['users'][player1_name]
+    return user
 
-def get_leaderboard():
-    """리더보드 조회"""
+def get_leaderboard(window=None):
+    """리더보드 조회 (window: day/week/month 이면 현재 기간 상위 유저)"""
+    if window:
+        return leaderboards.current_top(_windows_view(), 'multi', window)
 
     data = load_data()
     users = list(data['users'].values())
@@ -108,25 +255,102 @@ def save_single_leaderboard(username, score):
         'score': score,
         'timestamp': datetime.now().isoformat()
     }
-    data['single_leaderboard'].append(entry)
-    # 상위 20개만 유지
-    data['single_leaderboard'] = sorted(data['single_leaderboard'], key=lambda x: x['score'], reverse=True)[:20]
+    _apply_single(data, username, score, entry['timestamp'])
+    append_history('single', entry)
+    # 점수순으로 정렬된 상위 20개만 유지
+    leaderboards.insert_single(data['single_leaderboard'], entry, 20)
     save_data(data)
     return True
 
-def get_single_leaderboard():
-    """싱글 랭킹 조회"""
+def get_single_leaderboard(window=None):
+    """싱글 랭킹 조회 (window: day/week/month 이면 현재 기간 상위 기록)"""
+    if window:
+        return leaderboards.current_top(_windows_view(), 'single', window)
     data = load_data()
     return sorted(data.get('single_leaderboard', []), key=lambda x: x['score'], reverse=True)
 
 
 def reset_leaderboard():
     """리더보드 및 게임 기록 초기화"""
-    data = {'users': {}, 'games': []}
+    data = _empty_data()
     save_data(data)
+    if os.path.exists(HISTORY_FILE):
+        os.remove(HISTORY_FILE)
     return True
 
 def get_user_stats(username):
-    """특정 사용자 통계"""
+    """특정 사용자 통계 (멀티 전적 + 평균/승률, 싱글 기록, 상대별 전적), 기록이 없으면 None"""
     data = load_data()
-    return data['users'].get(username, None)
+    user = data['users'].get(username)
+    single = data['single_stats'].get(username)
+    if user is None and single is None:
+        return None
+    stats = _user_defaults(dict(user)) if user else {'username': username}
+    if user:
+        played = stats['games_played']
+        stats['average_score'] = round(stats['total_score'] / played, 2) if played else None
+        stats['win_rate'] = round(stats['wins'] / played, 4) if played else None
+    if single:
+        single = dict(single)
+        single['average_score'] = round(single['total_score'] / single['games'], 2) if single['games'] else None
+    stats['single'] = single
+    stats['head_to_head'] = data['head_to_head'].get(username, {})
+    return stats
+
+def rebuild_stats(data, games=None, single_games=None):
+    """경기 기록(주지 않으면 HISTORY_FILE)만으로 사용자 집계/싱글 집계/상대 전적/기간별 리더보드를 다시 계산한 새 data 반환"""
+    if games is None or single_games is None:
+        games, single_games = load_history()
+    rebuilt = dict(data, users={}, single_stats={}, head_to_head={}, windows={})
+    for game in games:
+        _apply_game(rebuilt, game['player1'], game['score1'], game.get('player2'), game.get('score2', 0),
+                    game.get('timestamp'))
+    for game in single_games:
+        _apply_single(rebuilt, game['username'], game['score'], game.get('timestamp'))
+    # 기록이 없는 사용자와 가입 시각은 그대로 유지
+    for name, user in data['users'].items():
+        if name not in rebuilt['users']:
+            _ensure_user(rebuilt, name)
+        rebuilt['users'][name]['created_at'] = user.get('created_at', rebuilt['users'][name]['created_at'])
+    return rebuilt
+
+def check_stats(data=None):
+    """저장된 집계와 기록으로 다시 계산한 집계가 다른 항목 목록 [(경로, 저장값, 계산값), ...]"""
+    data = data or load_data()
+    expected = rebuild_stats(data)
+    problems = []
+    for section in ('users', 'single_stats', 'head_to_head'):
+        stored, computed = data[section], expected[section]
+        for name in sorted(set(stored) | set(computed)):
+            a, b = stored.get(name), computed.get(name)
+            if section == 'users' and a is not None:
+                a = _user_defaults(dict(a))
+            if a != b:
+                problems.append((f'{section}.{name}', a, b))
+    for board, windows in expected['windows'].items():
+        for window, bucket in windows.items():
+            stored = data['windows'].get(board, {}).get(window)
+            if stored != bucket:
+                problems.append((f'windows.{board}.{window}', stored, bucket))
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description='게임 데이터 집계 관리')
+    parser.add_argument('command', choices=('rebuild', 'check'),
+                        help=f'rebuild: {HISTORY_FILE} 기록으로 집계를 다시 계산해 저장, check: 저장된 집계 검증')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        data = rebuild_stats(load_data())
+        save_data(data)
+        print(f"rebuilt stats for {len(data['users'])} users, {len(data['single_stats'])} single players")
+    else:
+        problems = check_stats()
+        for path, stored, computed in problems:
+            print(f'{path}: stored={stored} computed={computed}')
+        print('OK' if not problems else f'{len(problems)} mismatches')
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
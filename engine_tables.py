@@ -0,0 +1,302 @@
+"""yacht_engine 조회 테이블 (점수표/재굴림 결과 분포)을 여러 프로세스가 함께 쓰는 평탄한 버퍼로 제공
+
+dict/list 로 만든 테이블은 워커마다 따로 만들어지고, fork 로 물려받아도 참조 카운트가 바뀌면서
+페이지가 복사되어 결국 워커 수만큼 메모리를 차지한다. 그래서 테이블을 한 번 파일로 만들어 두고
+모든 프로세스가 읽기 전용 mmap 으로 연다 (기본 위치는 /dev/shm, 없으면 임시 디렉터리).
+같은 파일을 mmap 하면 물리 페이지 하나를 공유하고, 서버가 fork 전에 import 하면 매핑 자체를 물려받는다.
+
+주사위 목록은 순서 그대로 6진수 코드로 바꿔 인덱스로 쓴다 (정렬 불필요).
+    dice_code([d0, d1, ...]) = (d0-1) + (d1-1)*6 + (d2-1)*36 + ...
+kept 뒤에 굴린 결과를 이어 붙인 주사위의 코드는 dice_code(kept) + dice_code(outcome) * 6**len(kept) 이다.
+
+파일 구조 (리틀 엔디언, 헤더 16바이트 = MAGIC(8) + payload crc32(4) + payload 길이(4)):
+    EngineTables (항상 로드)
+        scores           uint8[6**5][12]   scores[code * 12 + cat]
+        probs            float64[k=1..5]   k 개를 다시 굴릴 때 각 결과(정렬된 눈 조합)의 확률
+        outcome codes    uint16[k=1..5]    같은 순서의 결과 코드 (정렬된 눈 목록의 dice_code)
+    DistributionTables (분석 API 가 처음 쓸 때 로드)
+        hist             float64[남은 굴림 1..MAX_LEVEL][keep 462][카테고리별 점수 값 수 합]
+        keep index       uint16[KEEP_OFFSET[5] + 6**5]   keep_index[KEEP_OFFSET[m] + dice_code(kept)]
+"""
+import glob
+import itertools
+import mmap
+import os
+import re
+import stat
+import struct
+import tempfile
+import zlib
+from array import array
+from collections import Counter
+from math import comb
+
+MAGIC = b'YACHTTB1'
+DIST_MAGIC = b'YACHTDS1'
+HEADER = struct.Struct('<8sII')
+NUM_DICE = 5
+NUM_CATEGORIES = 12
+MAX_REROLL = 5
+NUM_CODES = 6 ** NUM_DICE
+# k 개를 굴렸을 때 나오는 서로 다른 (정렬된) 결과 수: 6, 21, 56, 126, 252
+OUTCOME_COUNTS = [comb(k + 5, 5) for k in range(MAX_REROLL + 1)]
+# 남길 주사위(0~5개, 순서 무관) 조합: 개수별로 정렬된 튜플 462가지, 5개짜리 252가지는 최종 주사위 상태
+KEEPS = [k for m in range(NUM_DICE + 1) for k in itertools.combinations_with_replacement(range(1, 7), m)]
+FIRST_STATE = len(KEEPS) - OUTCOME_COUNTS[NUM_DICE]
+KEEP_OFFSET = [sum(6 ** i for i in range(m)) for m in range(NUM_DICE + 2)]
+MAX_LEVEL = 2  # 분포 테이블이 다루는 최대 남은 굴림 수
+
+
+def dice_code(dice):
+    code = 0
+    for d in reversed(dice):
+        code = code * 6 + d - 1
+    return code
+
+
+def decode(code, n):
+    dice = []
+    for _ in range(n):
+        code, d = divmod(code, 6)
+        dice.append(d + 1)
+    return dice
+
+
+def _outcome_distribution(k):
+    """k 개를 굴린 결과 [(정렬된 눈 튜플, 확률), ...] (itertools.product 순서로 처음 나온 순)"""
+    counts = Counter()
+    for out in itertools.product(range(1, 7), repeat=k):
+        counts[tuple(sorted(out))] += 1
+    total = 6 ** k
+    return [(out, cnt / total) for out, cnt in counts.items()]
+
+
+def build_payload(score_fn):
+    """score_fn(정렬된 주사위 튜플, cat) 로 채운 전체 테이블 bytes"""
+    scores = bytearray(NUM_CODES * NUM_CATEGORIES)
+    by_sorted = {}
+    for code in range(NUM_CODES):
+        key = tuple(sorted(decode(code, NUM_DICE)))
+        row = by_sorted.get(key)
+        if row is None:
+            row = by_sorted[key] = bytes(score_fn(key, cat) for cat in range(NUM_CATEGORIES))
+        scores[code * NUM_CATEGORIES:(code + 1) * NUM_CATEGORIES] = row
+    probs, codes = array('d'), array('H')
+    for k in range(1, MAX_REROLL + 1):
+        for out, prob in _outcome_distribution(k):
+            probs.append(prob)
+            codes.append(dice_code(out))
+    if probs.itemsize != 8 or codes.itemsize != 2:
+        raise RuntimeError('unexpected array item size')
+    return bytes(scores) + probs.tobytes() + codes.tobytes()
+
+
+def default_path(tag, name='tables'):
+    """tag 는 점수 규칙이 바뀌면 달라지는 값 (예전 규칙으로 만든 파일을 다시 쓰지 않도록)"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(base, f'yacht_engine_{name}.{uid}.{tag}.bin')
+
+
+_DEFAULT_NAME = re.compile(r'yacht_engine_(\w+)\.(\d+)\.[0-9a-f]+\.bin')
+
+
+def _remove_stale(path):
+    """path 가 default_path 이름이면 같은 사용자/테이블의 다른 tag 파일 삭제 (/dev/shm 은 메모리라 배포마다 쌓임)
+    이미 mmap 한 프로세스는 삭제 후에도 매핑을 그대로 쓸 수 있다."""
+    m = _DEFAULT_NAME.fullmatch(os.path.basename(path))
+    if m is None:
+        return
+    name, uid = m.groups()
+    for old in glob.glob(os.path.join(os.path.dirname(path), f'yacht_engine_{name}.{uid}.*.bin')):
+        if old == path or not _DEFAULT_NAME.fullmatch(os.path.basename(old)):
+            continue
+        try:
+            st = os.lstat(old)
+            if stat.S_ISREG(st.st_mode) and (not hasattr(os, 'getuid') or st.st_uid == os.getuid()):
+                os.unlink(old)
+        except OSError:
+            pass
+
+
+def _trusted(st):
+    """내가 만든 일반 파일이고 다른 사용자가 쓸 수 없는지 (/dev/shm 은 누구나 파일을 만들 수 있음)"""
+    if not stat.S_ISREG(st.st_mode) or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        return False
+    return not hasattr(os, 'getuid') or st.st_uid == os.getuid()
+
+
+def _read(path, magic):
+    """유효한 테이블 파일이면 mmap, 아니면 None"""
+    try:
+        with open(path, 'rb') as f:
+            if not _trusted(os.fstat(f.fileno())):
+                print(f"엔진 테이블 파일 무시 (소유자/권한 불일치): {path}")
+                return None
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    found, crc, length = HEADER.unpack_from(buf) if len(buf) >= HEADER.size else (None, 0, 0)
+    if found != magic or len(buf) != HEADER.size + length or zlib.crc32(buf[HEADER.size:]) != crc:
+        buf.close()
+        return None
+    return buf
+
+
+def _write(path, magic, payload):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    # 남이 미리 만들어 둔 임시 파일/링크는 쓰지 않고, umask 와 상관없이 그룹/기타 쓰기 권한 없이 만듦
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    with open(fd, 'wb') as f:
+        f.write(HEADER.pack(magic, zlib.crc32(payload), len(payload)))
+        f.write(payload)
+    os.replace(tmp, path)  # 여러 워커가 동시에 만들어도 내용이 같으므로 마지막 것이 남으면 됨
+
+
+def load_shared(path, magic, build):
+    """(버퍼, 공유 파일 경로 또는 None): path 의 테이블을 mmap, 없거나 깨졌으면 build() 로 만들어 기록 후 mmap
+    path 가 빈 문자열이거나 파일을 쓸 수 없으면 (다른 사용자의 파일이 자리를 차지한 경우 포함) 프로세스 내 bytes 로 만든다."""
+    if path:
+        buf = _read(path, magic)
+        if buf is None:
+            try:
+                _write(path, magic, build())
+                _remove_stale(path)
+            except OSError as e:
+                print(f"엔진 테이블 파일 생성 실패 ({path}): {e}")
+            buf = _read(path, magic)
+        if buf is not None:
+            return buf, path
+    payload = build()
+    return HEADER.pack(magic, zlib.crc32(payload), len(payload)) + payload, None
+
+
+class EngineTables:
+    """scores: memoryview('B'), outcomes(k): (코드 memoryview('H'), 확률 memoryview('d'))"""
+
+    def __init__(self, buf, path=None):
+        self.path = path  # None 이면 공유되지 않는 프로세스 내 버퍼
+        self._buf = buf
+        view = memoryview(buf)[HEADER.size:]
+        n_scores = NUM_CODES * NUM_CATEGORIES
+        n_outcomes = sum(OUTCOME_COUNTS[1:])
+        self.scores = view[:n_scores]
+        probs = view[n_scores:n_scores + 8 * n_outcomes].cast('d')
+        codes = view[n_scores + 8 * n_outcomes:].cast('H')
+        self._outcomes = [None]
+        start = 0
+        for k in range(1, MAX_REROLL + 1):
+            end = start + OUTCOME_COUNTS[k]
+            self._outcomes.append((codes[start:end], probs[start:end]))
+            start = end
+
+    def outcomes(self, k):
+        return self._outcomes[k]
+
+    @classmethod
+    def load(cls, score_fn, tag, path=None):
+        """path(기본 default_path(tag), 빈 문자열이면 공유 안 함)의 테이블을 열고, 없거나 깨졌으면 만들어서 연다"""
+        path = default_path(tag) if path is None else path
+        return cls(*load_shared(path, MAGIC, lambda: build_payload(score_fn)))
+
+
+def category_values(scores):
+    """카테고리별로 나올 수 있는 점수 값 (오름차순)"""
+    return [sorted({scores[dice_code(k) * NUM_CATEGORIES + cat] for k in KEEPS[FIRST_STATE:]})
+            for cat in range(NUM_CATEGORIES)]
+
+
+def build_distribution_payload(tables):
+    """카테고리마다 그 카테고리만 노리고 남은 굴림을 최선으로 썼을 때의 최종 점수 분포
+
+    hist[level][keep][cat] = keep 을 남기고 굴린 뒤 (level-1)번 더 굴릴 수 있을 때의 점수별 확률.
+    다음 굴림에서 남길 주사위는 그 카테고리 기대값이 가장 큰 쪽 (같으면 더 많이 남기는 쪽)이다.
+    """
+    values = category_values(tables.scores)
+    index = {k: i for i, k in enumerate(KEEPS)}
+    # keep → [(최종 상태 index, 확률), ...]
+    transitions = []
+    for keep in KEEPS:
+        n = NUM_DICE - len(keep)
+        codes, probs = tables.outcomes(n) if n else ((0,), (1.0,))
+        transitions.append([(index[tuple(sorted(keep + tuple(decode(code, n))))], prob)
+                            for code, prob in zip(codes, probs)])
+    # 상태별로 남길 수 있는 서로 다른 keep (많이 남기는 순)
+    sub_keeps = {}
+    for si in range(FIRST_STATE, len(KEEPS)):
+        state = KEEPS[si]
+        subs = {tuple(state[j] for j in range(NUM_DICE) if mask >> j & 1) for mask in range(1 << NUM_DICE)}
+        sub_keeps[si] = sorted((index[k] for k in subs), key=lambda ki: -len(KEEPS[ki]))
+    # 굴림이 남지 않은 상태의 분포: 현재 점수에 확률 1
+    dist = {}
+    for si in sub_keeps:
+        code = dice_code(KEEPS[si])
+        rows = []
+        for cat in range(NUM_CATEGORIES):
+            row = [0.0] * len(values[cat])
+            row[values[cat].index(tables.scores[code * NUM_CATEGORIES + cat])] = 1.0
+            rows.append(row)
+        dist[si] = rows
+
+    out = array('d')
+    for level in range(1, MAX_LEVEL + 1):
+        hist = []
+        for ki in range(len(KEEPS)):
+            rows = [[0.0] * len(values[cat]) for cat in range(NUM_CATEGORIES)]
+            for si, prob in transitions[ki]:
+                for row, src in zip(rows, dist[si]):
+                    for v, p in enumerate(src):
+                        if p:
+                            row[v] += prob * p
+            hist.append(rows)
+            for row in rows:
+                out.extend(row)
+        evs = [[sum(v * p for v, p in zip(values[cat], rows[cat])) for cat in range(NUM_CATEGORIES)]
+               for rows in hist]
+        next_dist = {}
+        for si, subs in sub_keeps.items():
+            rows = []
+            for cat in range(NUM_CATEGORIES):
+                best = subs[0]
+                for ki in subs[1:]:
+                    if evs[ki][cat] > evs[best][cat] + 1e-12:
+                        best = ki
+                rows.append(hist[best][cat])
+            next_dist[si] = rows
+        dist = next_dist
+
+    keep_index = array('H', [0] * (KEEP_OFFSET[NUM_DICE] + NUM_CODES))
+    for m in range(NUM_DICE + 1):
+        for code in range(6 ** m):
+            keep_index[KEEP_OFFSET[m] + code] = index[tuple(sorted(decode(code, m)))]
+    return out.tobytes() + keep_index.tobytes()
+
+
+class DistributionTables:
+    """hist(level, keep_idx, cat) → 점수별 확률 memoryview, values[cat] 와 같은 순서"""
+
+    def __init__(self, buf, path, values):
+        self.path = path
+        self._buf = buf
+        self.values = values
+        self.offsets = [sum(len(v) for v in values[:cat]) for cat in range(NUM_CATEGORIES + 1)]
+        self.width = self.offsets[-1]
+        view = memoryview(buf)[HEADER.size:]
+        n_hist = MAX_LEVEL * len(KEEPS) * self.width
+        self._hist = view[:8 * n_hist].cast('d')
+        self.keep_index = view[8 * n_hist:].cast('H')
+
+    def keep(self, kept):
+        """남긴 주사위 목록(순서 무관) → keep index"""
+        return self.keep_index[KEEP_OFFSET[len(kept)] + dice_code(kept)]
+
+    def hist(self, level, keep_idx, cat):
+        base = ((level - 1) * len(KEEPS) + keep_idx) * self.width
+        return self._hist[base + self.offsets[cat]:base + self.offsets[cat + 1]]
+
+    @classmethod
+    def load(cls, tables, tag, path=None):
+        """tables: EngineTables, path 규칙은 EngineTables.load 와 같음"""
+        path = default_path(tag, 'dist') if path is None else path
+        buf, path = load_shared(path, DIST_MAGIC, lambda: build_distribution_payload(tables))
+        return cls(buf, path, category_values(tables.scores))
@@ -0,0 +1,373 @@
+"""멀티 게임 방 이벤트 로그 (추가 전용, varint 인코딩)
+
+방을 바꾸는 모든 요청(생성/참가/관전/굴림/동기화/퇴장/삭제)을 한 레코드씩 남긴다.
+요청 스레드는 메모리 버퍼에 인코딩만 하고, 파일 쓰기는 백그라운드 스레드가 모아서 한다.
+파일이 max_bytes 를 넘으면 다음 파일로 넘어간다 (events/<실행ID>-<순번>.ylog).
+
+파일 형식: MAGIC + 시작 시각(ms, 8바이트) 뒤에 레코드가 이어진다.
+레코드는 종류 1바이트 + varint 필드들이고, 시각은 직전 레코드와의 차이(ms, zigzag)로 저장한다.
+방 코드/닉네임은 파일마다 처음 나올 때 STRING 레코드로 한 번만 쓰고 이후엔 번호로 참조한다.
+
+    python event_log.py stats events/
+    python event_log.py replay events/ ABC123 --version 12
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from room_state import EMPTY
+
+MAGIC = b'YEL1'
+
+STRING, CREATE, JOIN, OBSERVE, ROLL, SYNC, LEAVE, CLOSE = range(8)
+KIND_NAMES = {CREATE: 'create', JOIN: 'join', OBSERVE: 'observe', ROLL: 'roll',
+              SYNC: 'sync', LEAVE: 'leave', CLOSE: 'close'}
+
+# scores: SYNC 에서 바뀐 칸만 [(player, category, value), ...] (value None = 빈 칸)
+Event = namedtuple('Event', 'kind ts room player version dice kept rolls_left turn game_over scores',
+                   defaults=(None,) * 9)
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _put(buf, n):
+    while n > 0x7f:
+        buf.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+class EventLog:
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, flush_interval=1.0, buffer_bytes=1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.buffer_bytes = buffer_bytes
+        self._run = f'{int(time.time())}-{os.getpid()}'
+        self._seq = itertools.count()
+        self._lock = threading.Lock()     # 버퍼/문자열 표
+        self._io_lock = threading.Lock()  # 파일 쓰기 순서 보장
+        self._wake = threading.Event()
+        self._chunks = []  # 다 찬 파일들의 [(path, bytes)]
+        self._thread = None
+        self._new_file()
+
+    def _new_file(self):
+        self._path = os.path.join(self.directory, f'{self._run}-{next(self._seq):05d}.ylog')
+        self._last_ms = int(time.time() * 1000)
+        self._buf = bytearray(MAGIC + struct.pack('>Q', self._last_ms))
+        self._size = 0     # 이 파일에 이미 쓴 바이트
+        self._strings = {}
+
+    def _sid(self, buf, s):
+        sid = self._strings.get(s)
+        if sid is None:
+            sid = self._strings[s] = len(self._strings) + 1  # 0 은 None
+            raw = str(s).encode('utf-8')
+            buf.append(STRING)
+            _put(buf, len(raw))
+            buf += raw
+        return sid
+
+    def _record(self, kind, now, room, *fields):
+        """fields: str 은 문자열 번호, None 은 0, 나머지는 음이 아닌 정수(varint)"""
+        try:
+            with self._lock:
+                if self._size + len(self._buf) >= self.max_bytes:
+                    self._chunks.append((self._path, self._buf))
+                    self._new_file()
+                    self._wake.set()
+                known = len(self._strings)
+                buf = bytearray()
+                try:
+                    ids = [self._sid(buf, room)]
+                    for f in fields:
+                        if isinstance(f, str):
+                            ids.append(self._sid(buf, f))
+                        elif f is None:
+                            ids.append(0)
+                        else:
+                            ids.append(f)
+                    ms = int(now * 1000)
+                    buf.append(kind)
+                    _put(buf, _zigzag(ms - self._last_ms))
+                    for n in ids:
+                        _put(buf, n)  # 음수면 ValueError
+                except Exception:
+                    # 이 레코드에서 새로 번호를 준 문자열은 파일에 안 쓰였으므로 되돌림
+                    for s in [s for s, sid in self._strings.items() if sid > known]:
+                        del self._strings[s]
+                    raise
+                self._last_ms = ms
+                self._buf += buf
+                if len(self._buf) >= self.buffer_bytes:
+                    self._wake.set()
+        except Exception as e:
+            print(f"event log error: {e}")
+
+    # --- 이벤트 ---
+    def create(self, room, host, now):
+        self._record(CREATE, now, room, str(host))
+
+    def join(self, room, player, version, now):
+        self._record(JOIN, now, room, str(player), version)
+
+    def observe(self, room, user, now):
+        self._record(OBSERVE, now, room, str(user))
+
+    def roll(self, room, player, state, now):
+        self._record(ROLL, now, room, str(player), state.version, *_dice_fields(state))
+
+    def sync(self, room, player, prev_state, state, now):
+        """state, prev_state: room_state.GameState (점수판은 바뀐 칸만 기록)"""
+        changed = []
+        for name, p in state.player_states.items():
+            old = prev_state.player_states.get(name)
+            if old is p or p.scores is None:
+                continue
+            old_scores = old.scores if old is not None and old.scores is not None else ()
+            for cat, value in enumerate(p.scores):
+                if cat >= len(old_scores) or old_scores[cat] != value:
+                    changed += (str(name), cat, 0 if value == EMPTY else value + 1)
+        turn = state.turn
+        self._record(SYNC, now, room, str(player), state.version, *_dice_fields(state),
+                     None if turn is None else str(turn), 1 if state.game_over else 0, len(changed) // 3, *changed)
+
+    def leave(self, room, player, version, now):
+        """version: 남은 플레이어가 있으면 게임 종료 처리된 state 의 version, 아니면 0"""
+        self._record(LEAVE, now, room, str(player), version or 0)
+
+    def close(self, room, now):
+        self._record(CLOSE, now, room)
+
+    # --- 파일 쓰기 ---
+    def flush(self):
+        with self._io_lock:
+            with self._lock:
+                chunks, self._chunks = self._chunks, []
+                if len(self._buf) > (len(MAGIC) + 8 if self._size == 0 else 0):
+                    chunks.append((self._path, self._buf))
+                    self._size += len(self._buf)
+                    self._buf = bytearray()
+            if chunks:
+                os.makedirs(self.directory, exist_ok=True)
+            for path, data in chunks:
+                with open(path, 'ab') as f:
+                    f.write(data)
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"event log flush error: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='event-log', daemon=True)
+            self._thread.start()
+
+
+def _dice_fields(state):
+    mask = 0
+    for i, k in enumerate(state.kept):
+        if k:
+            mask |= 1 << i
+    return (len(state.dice), *state.dice, len(state.kept), mask, _zigzag(int(state.rolls_left)))
+
+
+# --- 읽기 ---
+def read_file(path):
+    """파일 하나의 Event 를 순서대로 생성 (쓰다 끊긴 마지막 레코드는 무시)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f'{path}: not an event log')
+    ms = struct.unpack_from('>Q', data, len(MAGIC))[0]
+    pos = len(MAGIC) + 8
+    end = len(data)
+    strings = [None]
+
+    def varint():
+        nonlocal pos
+        b = data[pos]
+        pos += 1
+        if b < 0x80:
+            return b
+        n, shift = b & 0x7f, 7
+        while True:
+            b = data[pos]
+            pos += 1
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def dice_fields():
+        dice = [varint() for _ in range(varint())]
+        n, mask = varint(), varint()
+        return dice, [(mask >> i) & 1 for i in range(n)], _unzigzag(varint())
+
+    while pos < end:
+        start = pos
+        try:
+            kind = data[pos]
+            pos += 1
+            if kind == STRING:
+                n = varint()
+                strings.append(data[pos:pos + n].decode('utf-8'))
+                pos += n
+                if pos > end:
+                    return
+                continue
+            ms += _unzigzag(varint())
+            room = strings[varint()]
+            if kind == ROLL:
+                player, version = strings[varint()], varint()
+                dice, kept, rolls_left = dice_fields()
+                yield Event(kind, ms / 1000, room, player, version, dice, kept, rolls_left)
+            elif kind == SYNC:
+                player, version = strings[varint()], varint()
+                dice, kept, rolls_left = dice_fields()
+                turn, game_over = strings[varint()], bool(varint())
+                scores = []
+                for _ in range(varint()):
+                    name, cat, value = strings[varint()], varint(), varint()
+                    scores.append((name, cat, value - 1 if value else None))
+                yield Event(kind, ms / 1000, room, player, version, dice, kept, rolls_left, turn, game_over, scores)
+            elif kind in (JOIN, LEAVE):
+                player, version = strings[varint()], varint()
+                yield Event(kind, ms / 1000, room, player, version)
+            elif kind in (CREATE, OBSERVE):
+                yield Event(kind, ms / 1000, room, strings[varint()])
+            elif kind == CLOSE:
+                yield Event(kind, ms / 1000, room)
+            else:
+                raise ValueError(f'{path}: unknown record kind {kind} at {start}')
+        except IndexError:
+            return
+
+
+def log_files(path):
+    """디렉터리면 안의 .ylog 를 실행별로 묶어 [[파일, ...], ...] 반환"""
+    if os.path.isfile(path):
+        return [[path]]
+    runs = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith('.ylog'):
+            runs.setdefault(name.rsplit('-', 1)[0], []).append(os.path.join(path, name))
+    return list(runs.values())
+
+
+def read_events(path):
+    """로그 파일/디렉터리의 모든 Event 를 시각 순으로 (여러 워커의 로그는 병합)"""
+    streams = [itertools.chain.from_iterable(read_file(p) for p in files) for files in log_files(path)]
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=lambda e: e.ts)
+
+
+# --- 재현 ---
+class Replayer:
+    """Event 를 순서대로 적용해 방 상태를 다시 만든다 (server.py 의 상태 변경과 같은 규칙)"""
+
+    def __init__(self):
+        self.rooms = {}
+
+    def apply(self, ev):
+        room = self.rooms.get(ev.room)
+        if ev.kind == CREATE:
+            self.rooms[ev.room] = {
+                "host": ev.player, "players": [ev.player], "observers": [],
+                "dice": [1] * 5, "kept": [0] * 5, "rolls_left": 3, "turn": ev.player,
+                "scores": {ev.player: [None] * 12}, "game_over": False, "version": 0,
+            }
+            return
+        if room is None:
+            return
+        if ev.kind == JOIN:
+            if ev.player not in room["players"]:
+                room["players"].append(ev.player)
+                host = room["players"][0]
+                room.update(dice=[1] * 5, kept=[0] * 5, rolls_left=3, turn=host, game_over=False,
+                            scores={host: [None] * 12, ev.player: [None] * 12}, version=ev.version)
+        elif ev.kind == OBSERVE:
+            if ev.player not in room["observers"]:
+                room["observers"].append(ev.player)
+        elif ev.kind == ROLL:
+            room.update(dice=ev.dice, kept=ev.kept, rolls_left=ev.rolls_left, version=ev.version)
+        elif ev.kind == SYNC:
+            room.update(dice=ev.dice, kept=ev.kept, rolls_left=ev.rolls_left, turn=ev.turn,
+                        game_over=ev.game_over, version=ev.version)
+            scores = room["scores"] = {name: card[:] for name, card in room["scores"].items()}
+            for name, cat, value in ev.scores:
+                card = scores.setdefault(name, [])
+                card.extend([None] * (cat + 1 - len(card)))
+                card[cat] = value
+        elif ev.kind == LEAVE:
+            if ev.player in room["players"]:
+                room["players"].remove(ev.player)
+            if ev.version:
+                room.update(game_over=True, version=ev.version)
+        elif ev.kind == CLOSE:
+            del self.rooms[ev.room]
+
+
+def replay(events, room, version=None):
+    """room 의 상태 (version 을 주면 그 version 시점), 없으면 None"""
+    replayer = Replayer()
+    state = None
+    for ev in events:
+        if ev.room != room:
+            continue
+        if version is not None and ev.version and ev.version > version:
+            break
+        replayer.apply(ev)
+        state = replayer.rooms.get(room) or state  # 삭제된 방은 마지막 상태
+    return json.loads(json.dumps(state)) if state is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Yacht 방 이벤트 로그 도구')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('stats', help='이벤트 종류별 개수와 읽기 속도')
+    p.add_argument('path')
+    p = sub.add_parser('replay', help='방 상태 재현')
+    p.add_argument('path')
+    p.add_argument('room')
+    p.add_argument('--version', type=int)
+    args = parser.parse_args()
+
+    if args.cmd == 'stats':
+        counts = {}
+        start = time.perf_counter()
+        for ev in read_events(args.path):
+            counts[ev.kind] = counts.get(ev.kind, 0) + 1
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        for kind, n in sorted(counts.items()):
+            print(f'{KIND_NAMES[kind]:<10}{n:>12}')
+        print(f"{'total':<10}{total:>12}  ({total / max(elapsed, 1e-9) * 60:,.0f} events/min)")
+    else:
+        state = replay(read_events(args.path), args.room, args.version)
+        if state is None:
+            parser.exit(1, f'room {args.room} not found\n')
+        print(json.dumps(state, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
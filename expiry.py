@@ -0,0 +1,52 @@
+import heapq
+import threading
+
+
+class ExpiryIndex:
+    """마감 시각 순 만료 인덱스 (지연 삭제 방식의 최소 힙)
+
+    touch()는 새 마감 시각을 힙에 넣기만 하고(O(log n)), 예전 항목은
+    pop_expired() 시점에 현재 마감 시각과 다르면 버린다.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+        self._lock = threading.Lock()
+
+    def touch(self, key, deadline):
+        """key의 마감 시각 갱신"""
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+            # 오래된 항목이 너무 쌓이면 힙 재구성
+            if len(self._heap) > 2 * len(self._deadlines) + 64:
+                self._heap = [(d, k) for k, d in self._deadlines.items()]
+                heapq.heapify(self._heap)
+
+    def discard(self, key):
+        """key 제거 (힙 항목은 만료 시 버려짐)"""
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def deadline(self, key):
+        with self._lock:
+            return self._deadlines.get(key)
+
+    def pop_expired(self, now):
+        """now 이전에 만료된 key 목록을 꺼내 반환"""
+        expired = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                deadline, key = heapq.heappop(heap)
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+                    expired.append(key)
+        return expired
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
@@ -0,0 +1,101 @@
+"""기간별(일/ISO 주/월) 리더보드
+
+게임 데이터의 'windows' 항목에 보드(single/multi)와 기간마다 현재 구간 하나만 둔다.
+
+    {'single': {'week': {'key': '2026-W42', 'top': [{username, score, timestamp}, ...]}, ...},
+     'multi':  {'week': {'key': '2026-W42', 'users': {name: 집계}, 'top': [name, ...]}, ...}}
+
+기록할 때 구간 키가 바뀌었으면 이전 구간을 버리고 새로 시작하고, 조회할 때 키가 지났으면 빈 목록을 준다.
+top 은 항상 정렬된 최대 TOP_K 개라서 쓰기는 이진 탐색 삽입으로 끝난다.
+멀티 집계(승/무/총점)는 한 구간 안에서 줄지 않으므로 점수가 바뀐 사람만 다시 끼워 넣으면 순위가 유지된다.
+
+조회는 저장할 때 top_view() 로 만든 {board: {window: {'key', 'top': [완성된 항목, ...]}}} 만 읽으므로
+(멀티 users 집계 제외) 읽는 양이 보드/기간마다 TOP_K 개로 고정된다.
+"""
+from bisect import insort
+from datetime import datetime
+
+WINDOWS = ('day', 'week', 'month')
+TOP_K = 20
+
+
+def bucket_key(window, when):
+    """when(datetime)이 속한 구간 이름"""
+    if window == 'day':
+        return when.strftime('%Y-%m-%d')
+    if window == 'week':
+        year, week, _ = when.isocalendar()
+        return f'{year}-W{week:02d}'
+    if window == 'month':
+        return when.strftime('%Y-%m')
+    raise ValueError(f'unknown window: {window}')
+
+
+def _single_rank(entry):
+    return -entry['score']
+
+
+def insert_single(top, entry, k=TOP_K):
+    """점수 내림차순 top 에 entry 삽입 (같은 점수는 먼저 기록한 쪽이 위), k 개 초과분은 버림"""
+    if len(top) >= k and entry['score'] <= top[-1]['score']:
+        return
+    insort(top, entry, key=_single_rank)
+    del top[k:]
+
+
+def _multi_rank(agg):
+    return (-agg['wins'], -agg['draws'], -agg['total_score'])
+
+
+def _bucket(boards, board, window, when, empty):
+    """현재 구간 bucket (키가 바뀌었으면 새로 만들어 교체)"""
+    key = bucket_key(window, when)
+    windows = boards.setdefault(board, {})
+    bucket = windows.get(window)
+    if bucket is None or bucket['key'] != key:
+        bucket = windows[window] = dict(empty, key=key)
+    return bucket
+
+
+def record_single(boards, entry, when):
+    for window in WINDOWS:
+        bucket = _bucket(boards, 'single', window, when, {'top': []})
+        insert_single(bucket['top'], entry)
+
+
+def record_multi(boards, results, when):
+    """results: [(username, score, 'W'|'D'|'L'), ...]"""
+    for window in WINDOWS:
+        bucket = _bucket(boards, 'multi', window, when, {'users': {}, 'top': []})
+        users, top = bucket['users'], bucket['top']
+        for name, score, result in results:
+            agg = users.get(name)
+            if agg is None:
+                agg = users[name] = {'wins': 0, 'draws': 0, 'losses': 0, 'total_score': 0, 'games_played': 0}
+            if name in top:
+                top.remove(name)
+            agg[{'W': 'wins', 'D': 'draws', 'L': 'losses'}[result]] += 1
+            agg['total_score'] += score
+            agg['games_played'] += 1
+            insort(top, name, key=lambda n: _multi_rank(users[n]))
+            del top[TOP_K:]
+
+
+def top_view(boards):
+    """조회용 사본: 싱글은 [{username, score, timestamp}, ...], 멀티는 [{username, wins, draws, ...}, ...]"""
+    view = {}
+    for board, windows in boards.items():
+        for window, bucket in windows.items():
+            top = bucket['top']
+            if board == 'multi':
+                top = [dict(bucket['users'][name], username=name) for name in top]
+            view.setdefault(board, {})[window] = {'key': bucket['key'], 'top': top}
+    return view
+
+
+def current_top(view, board, window, now=None):
+    """top_view() 에서 현재 구간 상위 목록 (키가 지났으면 빈 목록)"""
+    bucket = view.get(board, {}).get(window)
+    if bucket is None or bucket['key'] != bucket_key(window, now or datetime.now()):
+        return []
+    return [dict(e) for e in bucket['top']]
@@ -0,0 +1,131 @@
+"""대전 상대 자동 매칭 대기열
+
+enqueue 한 순서대로 두 명씩 짝지어 on_match(먼저 온 사람, 나중 온 사람) 로 방을 만들고,
+각자 wait() 로 기다리던 요청을 깨워 방 코드를 넘겨준다. 짝짓기는 대기열 앞의 두 명만 보므로 O(1) 이다.
+
+대기 중인 사람은 wait() 를 호출할 때마다 만료 시각이 늘어나고, timeout 동안 한 번도 기다리지 않으면
+(탭을 닫는 등) 대기열에서 빠진다. 매칭 결과도 timeout 동안 가져가지 않으면 버린다.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from expiry import ExpiryIndex
+
+QUEUE_SECONDS = metrics.histogram('yacht_matchmaking_queue_seconds', 'time from enqueue to being matched',
+                                  buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0))
+MATCHMAKING = metrics.counter('yacht_matchmaking_total', 'matchmaking queue exits by result', ('result',))
+
+WAITING = 'waiting'
+MATCHED = 'matched'
+
+
+class _Ticket:
+    __slots__ = ('username', 'enqueued_at', 'event', 'match')
+
+    def __init__(self, username, now):
+        self.username = username
+        self.enqueued_at = now
+        self.event = threading.Event()
+        self.match = None  # 매칭되면 {'code', 'players', 'opponent', 'waited_seconds'}
+
+
+class MatchQueue:
+    def __init__(self, on_match, timeout=30.0):
+        """on_match(host, guest) → 방 코드 (대기열 락을 잡은 채 호출됨)"""
+        self.on_match = on_match
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._waiting = OrderedDict()  # username → _Ticket (온 순서)
+        self._tickets = {}             # username → _Ticket (대기 중 + 결과를 아직 안 가져간 매칭)
+        self._expiry = ExpiryIndex()   # key: username
+
+    def __len__(self):
+        return len(self._waiting)
+
+    def _status(self, ticket):
+        if ticket.match is not None:
+            return dict(ticket.match, status=MATCHED)
+        return {'status': WAITING, 'queue_length': len(self._waiting)}
+
+    def enqueue(self, username, now=None):
+        """대기열에 넣고 현재 상태 반환 (이미 있으면 그대로, 상대가 있거나 이미 매칭됐으면 매칭 결과)"""
+        now = now or time.time()
+        with self._lock:
+            ticket = self._tickets.get(username)
+            if ticket is None:
+                ticket = self._tickets[username] = _Ticket(username, now)
+                self._waiting[username] = ticket
+                self._pair(now)
+            if ticket.match is not None:
+                # 매칭 결과를 이 응답으로 돌려주므로 wait() 로 다시 줄 필요 없음
+                del self._tickets[username]
+                self._expiry.discard(username)
+            else:
+                self._expiry.touch(username, now + self.timeout)
+            return self._status(ticket)
+
+    def _pair(self, now):
+        while len(self._waiting) >= 2:
+            _, host = self._waiting.popitem(last=False)
+            _, guest = self._waiting.popitem(last=False)
+            try:
+                code = self.on_match(host.username, guest.username)
+            except BaseException:
+                # 방을 못 만들었으면 두 사람을 원래 자리(맨 앞)로 되돌림
+                for ticket in (guest, host):
+                    self._waiting[ticket.username] = ticket
+                    self._waiting.move_to_end(ticket.username, last=False)
+                raise
+            players = [host.username, guest.username]
+            for ticket, opponent in ((host, guest), (guest, host)):
+                waited = now - ticket.enqueued_at
+                QUEUE_SECONDS.observe(waited)
+                MATCHMAKING.inc(MATCHED)
+                ticket.match = {'code': code, 'players': players, 'opponent': opponent.username,
+                                'waited_seconds': round(waited, 3)}
+                self._expiry.touch(ticket.username, now + self.timeout)
+                ticket.event.set()
+
+    def wait(self, username, timeout):
+        """매칭될 때까지 최대 timeout 초 대기, 매칭 결과는 한 번 돌려주면 지움 (대기열에 없으면 None)"""
+        with self._lock:
+            ticket = self._tickets.get(username)
+            if ticket is None:
+                return None
+            self._expiry.touch(username, time.time() + self.timeout + timeout)
+        ticket.event.wait(timeout)
+        with self._lock:
+            if self._tickets.get(username) is not ticket:
+                return None  # 기다리는 동안 취소/만료됐거나 다른 요청이 결과를 가져감
+            if ticket.match is not None:
+                del self._tickets[username]
+                self._expiry.discard(username)
+            else:
+                self._expiry.touch(username, time.time() + self.timeout)
+            return self._status(ticket)
+
+    def cancel(self, username):
+        """대기 중이면 빼고 True (이미 매칭됐으면 False)"""
+        with self._lock:
+            ticket = self._waiting.pop(username, None)
+            if ticket is None:
+                return False
+            del self._tickets[username]
+            self._expiry.discard(username)
+            MATCHMAKING.inc('cancelled')
+            ticket.event.set()
+            return True
+
+    def reap(self, now):
+        """timeout 동안 기다리지 않은 대기자와 가져가지 않은 매칭 결과 정리"""
+        for username in self._expiry.pop_expired(now):
+            with self._lock:
+                ticket = self._tickets.get(username)
+                if ticket is None or self._expiry.deadline(username) is not None:
+                    continue  # 만료 직전에 다시 enqueue/wait 한 경우
+                del self._tickets[username]
+                if self._waiting.pop(username, None) is not None:
+                    MATCHMAKING.inc('expired')
+                ticket.event.set()
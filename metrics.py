@@ -0,0 +1,160 @@
+"""Prometheus 텍스트 형식 메트릭 (외부 의존성 없음)
+
+기록은 메트릭마다 짧은 락 한 번(dict 갱신)만 사용하고, 문자열 변환은
+/metrics 수집 시점에만 한다. 라벨 값은 위치 인자로 넘긴다.
+
+    REQUESTS = metrics.counter('yacht_x_total', '설명', ('route',))
+    REQUESTS.inc('/api/rooms')
+"""
+import bisect
+import threading
+
+# 기본 지연 시간 버킷 (초)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_str(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _fmt(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, v in sorted(items):
+            lines.append(f'{self.name}{_label_str(self.labelnames, labels)} {_fmt(v)}')
+        return lines
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class GaugeFunc(_Metric):
+    """수집 시점에 fn() 값을 읽는 게이지"""
+    kind = 'gauge'
+
+    def __init__(self, name, help, fn):
+        super().__init__(name, help)
+        self._fn = fn
+
+    def render(self):
+        return self._header() + [f'{self.name} {_fmt(self._fn())}']
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # [버킷별 개수..., +Inf 개수, 합계]
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[i] += 1
+            entry[-1] += value
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = [(labels, list(entry)) for labels, entry in self._values.items()]
+        for labels, entry in sorted(items):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), entry[:-1]):
+                cumulative += n
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f'{self.name}_bucket{_label_str(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_str(self.labelnames, labels)} {_fmt(entry[-1])}')
+            lines.append(f'{self.name}_count{_label_str(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def counter(name, help, labelnames=()):
+    return _register(Counter(name, help, labelnames))
+
+
+def gauge(name, help, labelnames=()):
+    return _register(Gauge(name, help, labelnames))
+
+
+def gauge_func(name, help, fn):
+    return _register(GaugeFunc(name, help, fn))
+
+
+def histogram(name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def render():
+    """등록된 모든 메트릭을 Prometheus 텍스트 형식으로"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for m in metrics:
+        try:
+            lines.extend(m.render())
+        except Exception as e:
+            lines.append(f'# {m.name} unavailable: {_escape(e)}')
+    return '\n'.join(lines) + '\n'
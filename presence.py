@@ -0,0 +1,121 @@
+"""접속자 상태 인덱스 (username → 대기중/게임중)
+
+하트비트, 방 생성/참가/퇴장, 만료 정리 때마다 해당 유저의 상태만 다시 계산한다.
+상태가 실제로 바뀔 때마다 version 을 올리고 최근 변경 목록을 남겨 두므로,
+/api/online-users 는 같은 version 이면 캐시된 본문을, 클라이언트가 since 를 주면 그 뒤 변경분만 돌려준다.
+"""
+import json
+import threading
+from collections import deque
+
+WAITING = '대기중'
+PLAYING = '게임중'
+
+
+class PresenceIndex:
+    def __init__(self, log_size=4096):
+        self._lock = threading.Lock()
+        self._client_names = {}  # client_id → username
+        self._lobby = {}         # username → 로비 클라이언트 수
+        self._rooms = {}         # username → {room code: None} (마지막에 들어간 방이 표시 대상)
+        self._status = {}        # username → 응답용 entry dict (바뀌면 새 dict 로 교체)
+        self._log = deque(maxlen=log_size)  # (version, username)
+        self._encoded = None     # (version, 전체 목록 JSON bytes)
+        self.version = 0
+
+    def _refresh(self, username):
+        rooms = self._rooms.get(username)
+        if rooms:
+            entry = {'username': username, 'status': PLAYING, 'room': next(reversed(rooms))}
+        elif self._lobby.get(username):
+            entry = {'username': username, 'status': WAITING}
+        else:
+            entry = None
+        if entry == self._status.get(username):
+            return
+        if entry is None:
+            del self._status[username]
+        else:
+            self._status[username] = entry
+        self.version += 1
+        self._log.append((self.version, username))
+
+    # --- 이벤트 ---
+    def client_seen(self, client_id, username):
+        with self._lock:
+            old = self._client_names.get(client_id)
+            if old == username:
+                return
+            if old is not None:
+                self._drop_client(client_id, old)
+            if username:
+                self._client_names[client_id] = username
+                self._lobby[username] = self._lobby.get(username, 0) + 1
+                self._refresh(username)
+
+    def client_gone(self, client_id):
+        with self._lock:
+            old = self._client_names.get(client_id)
+            if old is not None:
+                self._drop_client(client_id, old)
+
+    def _drop_client(self, client_id, username):
+        del self._client_names[client_id]
+        left = self._lobby[username] - 1
+        if left:
+            self._lobby[username] = left
+        else:
+            del self._lobby[username]
+        self._refresh(username)
+
+    def join_room(self, username, code):
+        if not username:
+            return
+        with self._lock:
+            rooms = self._rooms.setdefault(username, {})
+            rooms.pop(code, None)
+            rooms[code] = None
+            self._refresh(username)
+
+    def leave_room(self, username, code):
+        with self._lock:
+            rooms = self._rooms.get(username)
+            if rooms is None or code not in rooms:
+                return
+            del rooms[code]
+            if not rooms:
+                del self._rooms[username]
+            self._refresh(username)
+
+    # --- 조회 ---
+    def status(self, username):
+        """한 유저의 entry (오프라인이면 None)"""
+        return self._status.get(username)
+
+    def snapshot(self):
+        """(version, [entry, ...])"""
+        with self._lock:
+            return self.version, list(self._status.values())
+
+    def encoded(self):
+        """(version, 전체 목록 JSON bytes), 같은 version 이면 다시 인코딩하지 않음"""
+        cached = self._encoded
+        if cached is not None and cached[0] == self.version:
+            return cached
+        version, users = self.snapshot()
+        cached = self._encoded = (version, json.dumps(users, ensure_ascii=False).encode('utf-8'))
+        return cached
+
+    def changes_since(self, since):
+        """since 이후 (version, 바뀐 entry 목록, 사라진 username 목록), 기록이 모자라면 None"""
+        with self._lock:
+            if since > self.version or (since < self.version and (not self._log or self._log[0][0] > since + 1)):
+                return None
+            names = set()
+            for v, name in reversed(self._log):
+                if v <= since:
+                    break
+                names.add(name)
+            changed = [self._status[n] for n in names if n in self._status]
+            removed = [n for n in names if n not in self._status]
+            return self.version, changed, removed
@@ -0,0 +1,163 @@
+"""요청 단위 cProfile 프로파일링 (기본 꺼짐)
+
+환경 변수로 켠다. 아무것도 지정하지 않으면 훅 자체를 등록하지 않으므로 오버헤드가 없다.
+
+- YACHT_PROFILE=1            대상 라우트의 모든 요청을 프로파일
+- YACHT_PROFILE_SAMPLE=N     대상 라우트 요청 N개 중 1개를 프로파일
+- YACHT_PROFILE_TOKEN=secret `X-Profile-Token: secret` 헤더가 붙은 요청을 프로파일,
+                             /api/profile 다운로드에도 같은 헤더가 필요 (토큰이 없으면 다운로드 라우트를
+                             등록하지 않고 YACHT_PROFILE_DIR 파일로만 남김)
+- YACHT_PROFILE_ROUTES       대상 라우트 접두사 (기본: /api/recommend,/api/rooms)
+- YACHT_PROFILE_DIR          라우트별 누적 결과를 주기적으로 저장할 디렉터리 (기본: profiles)
+- YACHT_PROFILE_KEEP         라우트별로 남겨둘 파일 수 (기본: 10)
+
+cProfile 은 동시에 하나만 켤 수 있으므로 이미 다른 요청을 프로파일 중이면 건너뛴다.
+"""
+import cProfile
+import hmac
+import io
+import itertools
+import marshal
+import os
+import pstats
+import re
+import threading
+import time
+
+from flask import Response, g, jsonify, request
+
+DUMP_INTERVAL = 30.0  # 누적 결과를 파일로 쓰는 최소 간격 (초)
+TOKEN_HEADER = 'X-Profile-Token'
+
+
+class RequestProfiler:
+    def __init__(self, always=False, sample=0, token=None, routes=('/api/recommend', '/api/rooms'),
+                 directory='profiles', keep=10):
+        self.always = always
+        self.sample = sample
+        self.token = token
+        self.routes = tuple(routes)
+        self.directory = directory
+        self.keep = keep
+        self._counter = itertools.count(1)
+        self._active = threading.Lock()  # cProfile 은 한 번에 하나만
+        self._stats_lock = threading.Lock()
+        self._stats = {}    # route → pstats.Stats
+        self._counts = {}   # route → 프로파일한 요청 수
+        self._last_dump = time.time()
+
+    @classmethod
+    def from_env(cls):
+        env = os.environ
+        routes = [r.strip() for r in env.get('YACHT_PROFILE_ROUTES', '/api/recommend,/api/rooms').split(',') if r.strip()]
+        return cls(
+            always=env.get('YACHT_PROFILE', '') not in ('', '0'),
+            sample=int(env.get('YACHT_PROFILE_SAMPLE', '0') or 0),
+            token=env.get('YACHT_PROFILE_TOKEN') or None,
+            routes=routes,
+            directory=env.get('YACHT_PROFILE_DIR', 'profiles'),
+            keep=int(env.get('YACHT_PROFILE_KEEP', '10') or 10),
+        )
+
+    @property
+    def enabled(self):
+        return bool(self.always or self.sample > 0 or self.token)
+
+    def _authorized(self):
+        supplied = request.headers.get(TOKEN_HEADER)
+        return bool(self.token and supplied and
+                    hmac.compare_digest(supplied.encode('utf-8'), self.token.encode('utf-8')))
+
+    def _wanted(self, route):
+        if route == '/api/profile':
+            return False
+        if self.token and request.headers.get(TOKEN_HEADER):
+            return self._authorized()
+        if not route.startswith(self.routes):
+            return False
+        if self.always:
+            return True
+        return self.sample > 0 and next(self._counter) % self.sample == 0
+
+    def _start(self):
+        route = request.url_rule.rule if request.url_rule else None
+        if route is None or not self._wanted(route):
+            return
+        if not self._active.acquire(blocking=False):
+            return
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # 다른 프로파일러(디버거 등)가 이미 켜져 있음
+            self._active.release()
+            return
+        g.profile = (route, prof)
+
+    def _finish(self, exc):
+        entry = g.pop('profile', None)
+        if entry is None:
+            return
+        route, prof = entry
+        prof.disable()
+        self._active.release()
+        with self._stats_lock:
+            if route in self._stats:
+                self._stats[route].add(prof)
+            else:
+                self._stats[route] = pstats.Stats(prof)
+            self._counts[route] = self._counts.get(route, 0) + 1
+            due = time.time() - self._last_dump >= DUMP_INTERVAL
+            if due:
+                self._last_dump = time.time()
+        if due:
+            self.dump()
+
+    @staticmethod
+    def _slug(route):
+        return re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+
+    def dump(self):
+        """라우트별 누적 결과를 디렉터리에 저장하고 오래된 파일은 삭제"""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        with self._stats_lock:
+            for route, stats in self._stats.items():
+                slug = self._slug(route)
+                stats.dump_stats(os.path.join(self.directory, f'{slug}-{stamp}.prof'))
+                files = sorted(f for f in os.listdir(self.directory)
+                               if f.startswith(slug + '-') and f.endswith('.prof'))
+                for old in files[:-self.keep]:
+                    os.remove(os.path.join(self.directory, old))
+
+    def download(self):
+        """GET /api/profile?route=/api/recommend[&format=prof|text][&limit=40]"""
+        if not self.token or not self._authorized():
+            return jsonify({"error": "unauthorized"}), 403
+        route = request.args.get('route')
+        with self._stats_lock:
+            if not route:
+                return jsonify({"routes": dict(self._counts), "directory": self.directory})
+            stats = self._stats.get(route)
+            if stats is None:
+                return jsonify({"error": "no profile for route", "routes": list(self._counts)}), 404
+            if request.args.get('format') == 'prof':
+                # pstats.Stats(path) / snakeviz 등으로 열 수 있는 marshal 형식
+                data = marshal.dumps(stats.stats)
+                filename = f'{self._slug(route)}.prof'
+                return Response(data, mimetype='application/octet-stream',
+                                headers={'Content-Disposition': f'attachment; filename={filename}'})
+            buf = io.StringIO()
+            view = pstats.Stats(stream=buf)
+            view.add(stats)
+            view.sort_stats('cumulative').print_stats(request.args.get('limit', 40, type=int))
+        return Response(f'# {route}: {self._counts[route]} requests\n' + buf.getvalue(), mimetype='text/plain')
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        app.before_request(self._start)
+        app.teardown_request(self._finish)
+        if self.token:
+            # 프로파일에는 함수 이름/파일 경로/처리 시간이 그대로 담기므로 토큰 없이는 열지 않음
+            app.add_url_rule('/api/profile', 'profile_download', self.download)
@@ -0,0 +1,79 @@
+"""GET /api/rooms/<code> 응답 본문 캐시
+
+방 상태는 version 이 바뀔 때만 바뀌는데, 플레이어와 관전자 모두가 1.2초마다 폴링한다.
+그래서 방마다 마지막으로 인코딩한 본문을 (version, host, players, observers) 키로 보관하고
+같은 키의 요청은 같은 바이트를 그대로 보낸다.
+
+요청마다 달라지는 turn_left_seconds 는 state 의 마지막 필드로 두고 본문 끝에 이어 붙인다.
+gzip 본은 (키, turn_left_seconds) 가 같은 동안만 재사용하므로 관전자가 많아도 방당 초당 한 번 압축한다.
+"""
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+import metrics
+from assets import COMPRESS_MIN
+
+PAYLOADS = metrics.counter('yacht_room_payload_total', 'GET /api/rooms/<code> bodies by cache result', ('result',))
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class RoomPayload:
+    __slots__ = ('key', 'head', '_gzip')
+
+    def __init__(self, key, head):
+        self.key = key
+        self.head = head    # '{..., "state": {...' 까지 (닫는 괄호 전)
+        self._gzip = None   # (turn_left, 압축 본문)
+
+    def body(self, turn_left):
+        return b''.join((self.head, b',"turn_left_seconds":', _dumps(turn_left), b'}}'))
+
+    def gzip_body(self, turn_left):
+        cached = self._gzip
+        if cached is not None and cached[0] == turn_left:
+            return cached[1]
+        data = gzip.compress(self.body(turn_left), compresslevel=6, mtime=0)
+        self._gzip = (turn_left, data)
+        return data
+
+    @property
+    def compressible(self):
+        return len(self.head) >= COMPRESS_MIN
+
+
+class RoomPayloadCache:
+    """방 코드 → 마지막 RoomPayload (최대 max_rooms 개, LRU)"""
+
+    def __init__(self, max_rooms=20000):
+        self.max_rooms = max_rooms
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code, room_view, state):
+        """room_view: host/players/observers 가 담긴 응답 필드 dict, state: room_state.GameState"""
+        key = (state.version, room_view['host'], room_view['players'], room_view['observers'])
+        with self._lock:
+            payload = self._entries.get(code)
+            if payload is not None and payload.key == key:
+                self._entries.move_to_end(code)
+                PAYLOADS.inc('hit')
+                return payload
+        outer = _dumps(dict(room_view, code=code))
+        head = outer[:-1] + b',"state":' + _dumps(state.to_dict())[:-1]
+        payload = RoomPayload(key, head)
+        PAYLOADS.inc('encode')
+        with self._lock:
+            self._entries[code] = payload
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.max_rooms:
+                self._entries.popitem(last=False)
+        return payload
+
+    def discard(self, code):
+        with self._lock:
+            self._entries.pop(code, None)
@@ -0,0 +1,90 @@
+import threading
+import zlib
+from contextlib import contextmanager
+
+
+class _RoomEntry:
+    __slots__ = ('room', 'lock')
+
+    def __init__(self, room):
+        self.room = room
+        self.lock = threading.RLock()
+
+
+class RoomRegistry:
+    """방 코드 → 방 정보 저장소 (샤드 단위 락 + 방 단위 락)
+
+    - 생성/조회/삭제는 방 코드의 해시로 고른 샤드 락만 잡는다.
+    - 방 내용 변경은 locked()로 해당 방의 락을 잡고 수행한다.
+    - 한 번 공개된 state/플레이어 목록은 수정하지 않고 새 객체로 교체한다 (room_state.py).
+      그래서 읽는 쪽은 락 안에서 참조만 복사해 두고 락 밖에서 직렬화하면 된다.
+    락 순서는 항상 방 락 → 샤드 락 이다.
+    """
+
+    def __init__(self, shards=16):
+        self._shards = [(threading.Lock(), {}) for _ in range(shards)]
+
+    def _shard(self, code):
+        return self._shards[zlib.crc32(code.encode('utf-8')) % len(self._shards)]
+
+    def create(self, code, room):
+        """code가 비어 있으면 방을 등록하고 True, 이미 있으면 False"""
+        lock, entries = self._shard(code)
+        with lock:
+            if code in entries:
+                return False
+            entries[code] = _RoomEntry(room)
+            return True
+
+    def get(self, code, default=None):
+        lock, entries = self._shard(code)
+        with lock:
+            entry = entries.get(code)
+        return entry.room if entry else default
+
+    def pop(self, code, default=None):
+        lock, entries = self._shard(code)
+        with lock:
+            entry = entries.pop(code, None)
+        return entry.room if entry else default
+
+    def replace(self, code, room):
+        """방 객체 자체를 교체 (해당 방 락을 잡은 상태에서만 호출)"""
+        lock, entries = self._shard(code)
+        with lock:
+            entry = entries.get(code)
+            if entry is not None:
+                entry.room = room
+
+    @contextmanager
+    def locked(self, code):
+        """방 락을 잡은 채로 방 객체를 넘겨줌 (없거나 도중에 삭제됐으면 None)"""
+        lock, entries = self._shard(code)
+        with lock:
+            entry = entries.get(code)
+        if entry is None:
+            yield None
+            return
+        with entry.lock:
+            with lock:
+                alive = entries.get(code) is entry
+            yield entry.room if alive else None
+
+    def items(self):
+        """(code, room) 목록 스냅샷"""
+        result = []
+        for lock, entries in self._shards:
+            with lock:
+                result.extend((code, entry.room) for code, entry in entries.items())
+        return result
+
+    def keys(self):
+        return [code for code, _ in self.items()]
+
+    def __contains__(self, code):
+        lock, entries = self._shard(code)
+        with lock:
+            return code in entries
+
+    def __len__(self):
+        return sum(len(entries) for _, entries in self._shards)
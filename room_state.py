@@ -0,0 +1,171 @@
+"""멀티 게임 방/플레이어 상태 (__slots__ 객체 + array)
+
+방 하나를 dict/list 여러 겹 대신 슬롯 객체 몇 개와 작은 정수 배열로 보관한다.
+API 응답/스냅샷/공유 상태 서비스가 쓰는 기존 JSON 모양은 to_dict() 에서만 만든다.
+
+GameState 와 PlayerState 는 한 번 방에 넣으면 수정하지 않고 replace() 로 새 객체를 만든다.
+바뀌지 않은 플레이어의 PlayerState 는 새 GameState 와 그대로 공유한다.
+"""
+from array import array
+
+NUM_CATEGORIES = 12
+EMPTY = -1  # 점수판 빈 칸 (JSON 에서는 null)
+AI_MSG = "AI: 새 게임을 시작하세요"
+
+
+def dice_array(values):
+    """주사위 눈/keep 여부 → 1바이트 배열 (범위를 벗어나면 OverflowError/TypeError)"""
+    return array('b', values)
+
+
+def scorecard_array(card):
+    return array('h', [EMPTY if v is None else v for v in card])
+
+
+def scorecard_list(card):
+    return [None if v == EMPTY else v for v in card]
+
+
+class PlayerState:
+    """플레이어별 주사위/keep/남은 굴림/점수판 (없는 항목은 None)"""
+    __slots__ = ('dice', 'kept', 'rolls_left', 'scores')
+
+    def __init__(self, dice=None, kept=None, rolls_left=None, scores=None):
+        self.dice = dice
+        self.kept = kept
+        self.rolls_left = rolls_left
+        self.scores = scores
+
+    @classmethod
+    def new(cls):
+        return cls(dice_array([1] * 5), dice_array([0] * 5), 3, scorecard_array([None] * NUM_CATEGORIES))
+
+    def replace(self, **changes):
+        p = PlayerState(self.dice, self.kept, self.rolls_left, self.scores)
+        for name, value in changes.items():
+            setattr(p, name, value)
+        return p
+
+
+class GameState:
+    __slots__ = ('dice', 'kept', 'rolls_left', 'turn', 'turn_start_time', 'game_over', 'ai_msg',
+                 'version', 'updated_by', 'players', 'player_states')
+
+    def __init__(self, players=(), player_states=None, dice=None, kept=None, rolls_left=3, turn=None,
+                 turn_start_time=None, game_over=False, ai_msg=AI_MSG, version=0, updated_by=None):
+        self.players = players
+        self.player_states = player_states if player_states is not None else {}
+        self.dice = dice if dice is not None else dice_array([1] * 5)
+        self.kept = kept if kept is not None else dice_array([0] * 5)
+        self.rolls_left = rolls_left
+        self.turn = turn
+        self.turn_start_time = turn_start_time
+        self.game_over = game_over
+        self.ai_msg = ai_msg
+        self.version = version
+        self.updated_by = updated_by
+
+    @classmethod
+    def new_game(cls, players, **fields):
+        """players 전원이 빈 점수판으로 시작하는 state, 첫 턴은 players[0]"""
+        return cls(players, {p: PlayerState.new() for p in players}, turn=players[0], **fields)
+
+    def replace(self, **changes):
+        s = GameState.__new__(GameState)
+        for name in GameState.__slots__:
+            setattr(s, name, changes[name] if name in changes else getattr(self, name))
+        return s
+
+    def with_player(self, name, **changes):
+        """name 의 PlayerState 만 바꾼 player_states dict (나머지는 공유)"""
+        current = self.player_states.get(name) or PlayerState()
+        return dict(self.player_states, **{name: current.replace(**changes)})
+
+    def scorecard(self, name):
+        p = self.player_states.get(name)
+        return scorecard_list(p.scores) if p is not None and p.scores is not None else None
+
+    def scores(self):
+        return {name: scorecard_list(p.scores) for name, p in self.player_states.items() if p.scores is not None}
+
+    def to_dict(self):
+        ps = self.player_states.items()
+        return {
+            "dice": list(self.dice),
+            "kept": list(self.kept),
+            "rolls_left": self.rolls_left,
+            "scores": self.scores(),
+            "player_dice": {n: list(p.dice) for n, p in ps if p.dice is not None},
+            "player_kept": {n: list(p.kept) for n, p in ps if p.kept is not None},
+            "player_rolls_left": {n: p.rolls_left for n, p in ps if p.rolls_left is not None},
+            "turn": self.turn,
+            "turn_start_time": self.turn_start_time,
+            "game_over": self.game_over,
+            "ai_msg": self.ai_msg,
+            "version": self.version,
+            "updated_by": self.updated_by,
+            "players": list(self.players),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        fields = {}
+        for key, attr, convert in (("player_dice", "dice", dice_array), ("player_kept", "kept", dice_array),
+                                   ("player_rolls_left", "rolls_left", None), ("scores", "scores", scorecard_array)):
+            for name, value in (d.get(key) or {}).items():
+                fields.setdefault(name, {})[attr] = convert(value) if convert else value
+        return cls(
+            tuple(d.get("players") or ()),
+            {name: PlayerState(**f) for name, f in fields.items()},
+            dice_array(d.get("dice") or [1] * 5),
+            dice_array(d.get("kept") or [0] * 5),
+            d.get("rolls_left", 3),
+            d.get("turn"),
+            d.get("turn_start_time"),
+            d.get("game_over", False),
+            d.get("ai_msg", AI_MSG),
+            d.get("version", 0),
+            d.get("updated_by"),
+        )
+
+
+class Room:
+    """players/observers 는 튜플 (바꿀 때는 새 튜플로 교체), player_last_seen 만 제자리에서 갱신"""
+    __slots__ = ('host', 'players', 'observers', 'state', 'created_at', 'last_update', 'started_full',
+                 'player_last_seen')
+
+    def __init__(self, host, players, state, created_at, observers=(), last_update=None, started_full=False,
+                 player_last_seen=None):
+        self.host = host
+        self.players = players
+        self.observers = observers
+        self.state = state
+        self.created_at = created_at
+        self.last_update = last_update if last_update is not None else created_at
+        self.started_full = started_full
+        self.player_last_seen = player_last_seen if player_last_seen is not None else {}
+
+    def to_dict(self):
+        return {
+            "host": self.host,
+            "players": list(self.players),
+            "observers": list(self.observers),
+            "state": self.state.to_dict(),
+            "created_at": self.created_at,
+            "last_update": self.last_update,
+            "started_full": self.started_full,
+            "player_last_seen": dict(self.player_last_seen),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            d["host"],
+            tuple(d.get("players") or ()),
+            GameState.from_dict(d.get("state") or {}),
+            d.get("created_at"),
+            tuple(d.get("observers") or ()),
+            d.get("last_update"),
+            d.get("started_full", False),
+            dict(d.get("player_last_seen") or {}),
+        )
@@ -0,0 +1,241 @@
+"""방/로비 상태 저장소
+
+- LocalStore: 프로세스 내 저장소 (기존 dict 방식, 기본값)
+- RemoteStore: state_service.py 로 띄운 공유 상태 서비스에 소켓으로 접속
+- ShardedStore: 방 코드(로비는 client_id)의 해시로 담당 서비스를 골라 라우팅
+
+어느 저장소든 `store.rooms` 는 RoomRegistry 와 같은 인터페이스
+(create / get / pop / locked / items / keys / in / len)를 제공한다.
+YACHT_STATE_SERVERS="127.0.0.1:7001,127.0.0.1:7002" 처럼 지정하면 여러 워커
+프로세스가 같은 상태를 공유하므로 어느 워커든 어느 요청이든 처리할 수 있다.
+"""
+import json
+import os
+import socket
+import threading
+import zlib
+from contextlib import contextmanager
+
+from room_registry import RoomRegistry
+from room_state import Room
+
+
+def route_key(key, n_shards):
+    """방 코드/client_id → 담당 샤드 번호 (모든 프로세스에서 동일한 결과)"""
+    return zlib.crc32(key.encode('utf-8')) % n_shards
+
+
+class LocalStore:
+    """프로세스 내 저장소"""
+
+    def __init__(self):
+        self.rooms = RoomRegistry()
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+    def touch_client(self, client_id, username, now):
+        with self._clients_lock:
+            self._clients[client_id] = {'last_seen': now, 'username': username}
+
+    def expire_client(self, client_id, cutoff):
+        """last_seen 이 cutoff 이전이면 제거하고 True"""
+        with self._clients_lock:
+            info = self._clients.get(client_id)
+            if info and info['last_seen'] < cutoff:
+                del self._clients[client_id]
+                return True
+            return False
+
+    def clients(self):
+        """[(client_id, info), ...] 스냅샷"""
+        with self._clients_lock:
+            return list(self._clients.items())
+
+    def client_count(self):
+        return len(self._clients)
+
+
+def parse_address(addr):
+    """'host:port' 또는 'unix:/path/to.sock'"""
+    if addr.startswith('unix:'):
+        return socket.AF_UNIX, addr[len('unix:'):]
+    host, _, port = addr.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+class StoreError(Exception):
+    pass
+
+
+class RemoteStore:
+    """state_service 클라이언트 (스레드마다 연결 하나, 한 줄 JSON 요청/응답)"""
+
+    def __init__(self, addr, timeout=5.0):
+        self.addr = addr
+        self.timeout = timeout
+        self._local = threading.local()
+        self.rooms = _RemoteRooms(self)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            family, address = parse_address(self.addr)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(address)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+        return conn
+
+    def _drop_conn(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def call(self, op, **args):
+        args['op'] = op
+        payload = json.dumps(args, ensure_ascii=False).encode('utf-8') + b'\n'
+        # 락을 잡고 있지 않을 때만 재연결 후 한 번 재시도 (연결이 끊기면 서비스가 락을 푼다)
+        attempts = 1 if getattr(self._local, 'held', 0) else 2
+        for attempt in range(attempts):
+            try:
+                sock, reader = self._conn()
+                sock.sendall(payload)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError('state service closed connection')
+                break
+            except OSError:
+                self._drop_conn()
+                if attempt == attempts - 1:
+                    raise
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise StoreError(reply.get('error'))
+        return reply.get('result')
+
+    def touch_client(self, client_id, username, now):
+        self.call('touch_client', client_id=client_id, username=username, now=now)
+
+    def expire_client(self, client_id, cutoff):
+        return self.call('expire_client', client_id=client_id, cutoff=cutoff)
+
+    def clients(self):
+        return [tuple(item) for item in self.call('clients')]
+
+    def client_count(self):
+        return self.call('client_count')
+
+
+class _RemoteRooms:
+    """서비스에는 Room.to_dict() 모양으로 저장하고, 꺼낼 때 Room 으로 되돌림"""
+
+    def __init__(self, store):
+        self._store = store
+
+    def create(self, code, room):
+        return self._store.call('create', code=code, room=room.to_dict())
+
+    def get(self, code, default=None):
+        room = self._store.call('get', code=code)
+        return default if room is None else Room.from_dict(room)
+
+    def pop(self, code, default=None):
+        room = self._store.call('pop', code=code)
+        return default if room is None else Room.from_dict(room)
+
+    @contextmanager
+    def locked(self, code):
+        """서비스 쪽 방 락을 잡고 사본을 넘겨줌, 블록이 정상 종료되면 사본을 기록"""
+        store = self._store
+        room = store.call('lock', code=code)
+        room = None if room is None else Room.from_dict(room)
+        store._local.held = getattr(store._local, 'held', 0) + 1
+        try:
+            yield room
+        except BaseException:
+            store._local.held -= 1
+            store.call('unlock', code=code, room=None)
+            raise
+        store._local.held -= 1
+        store.call('unlock', code=code, room=None if room is None else room.to_dict())
+
+    def items(self):
+        return [(code, Room.from_dict(room)) for code, room in self._store.call('items')]
+
+    def keys(self):
+        return self._store.call('keys')
+
+    def __contains__(self, code):
+        return self._store.call('contains', code=code)
+
+    def __len__(self):
+        return self._store.call('len')
+
+
+class ShardedStore:
+    """여러 저장소에 방 코드/client_id 해시로 분산, 로비 전체 조회는 합산"""
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+        self.rooms = _ShardedRooms([b.rooms for b in self.backends])
+
+    def _for(self, key):
+        return self.backends[route_key(key, len(self.backends))]
+
+    def touch_client(self, client_id, username, now):
+        self._for(client_id).touch_client(client_id, username, now)
+
+    def expire_client(self, client_id, cutoff):
+        return self._for(client_id).expire_client(client_id, cutoff)
+
+    def clients(self):
+        return [item for b in self.backends for item in b.clients()]
+
+    def client_count(self):
+        return sum(b.client_count() for b in self.backends)
+
+
+class _ShardedRooms:
+    def __init__(self, shards):
+        self._shards = shards
+
+    def _for(self, code):
+        return self._shards[route_key(code, len(self._shards))]
+
+    def create(self, code, room):
+        return self._for(code).create(code, room)
+
+    def get(self, code, default=None):
+        return self._for(code).get(code, default)
+
+    def pop(self, code, default=None):
+        return self._for(code).pop(code, default)
+
+    def locked(self, code):
+        return self._for(code).locked(code)
+
+    def items(self):
+        return [item for s in self._shards for item in s.items()]
+
+    def keys(self):
+        return [code for s in self._shards for code in s.keys()]
+
+    def __contains__(self, code):
+        return code in self._for(code)
+
+    def __len__(self):
+        return sum(len(s) for s in self._shards)
+
+
+def from_env():
+    """YACHT_STATE_SERVERS 가 있으면 공유 상태 서비스, 없으면 프로세스 내 저장소"""
+    servers = [a.strip() for a in os.environ.get('YACHT_STATE_SERVERS', '').split(',') if a.strip()]
+    if not servers:
+        return LocalStore()
+    return ShardedStore(RemoteStore(addr) for addr in servers)
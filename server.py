@@ -1,46 +1,129 @@
+import atexit
 import os
 import random
 import string
 import time
-import psutil
 import secrets
-from flask import Flask, render_template, jsonify, request
+import threading
+from flask import Flask, Response, jsonify, request, g
 import yacht_engine
 import database
-
-app = Flask(__name__)
-
-# 메모리 내 데이터 저장소
-rooms = {}
-# lobby_clients: { client_id: { 'last_seen': time, 'username': name } }
-lobby_clients = {}
+import leaderboards
+import assets
+import expiry
+import metrics
+import profiling
+import room_store
+from system_sampler import SystemSampler
+from speculative import SpeculativeSolver
+from admission import ConcurrencyLimit, TokenBucketLimiter
+from snapshots import RoomSnapshotter
+from event_log import EventLog
+from room_state import NUM_CATEGORIES, GameState, PlayerState, Room, dice_array, scorecard_array
+from room_payloads import RoomPayloadCache
+from presence import PresenceIndex
+from matchmaking import MatchQueue
+
+# 정적 파일은 assets.StaticAssets 가 지문 URL/압축본으로 직접 서빙
+app = Flask(__name__, static_folder=None)
+static_assets = assets.StaticAssets(os.path.join(app.root_path, 'static'))
+static_assets.init_app(app)
+pages = assets.PageCache()
+
+# 방/로비 상태 저장소 (기본: 프로세스 내 메모리, YACHT_STATE_SERVERS 지정 시 공유 상태 서비스)
+store = room_store.from_env()
+# rooms: 방 단위 락, 샤드 단위 생성/삭제 (room_registry.RoomRegistry 인터페이스)
+rooms = store.rooms
+# 프로세스 내 저장소면 이 프로세스가 모든 상태 변경을 보므로 증분 인덱스/스냅샷을 쓸 수 있음
+LOCAL_STATE = isinstance(store, room_store.LocalStore)
+# 로비 클라이언트: { client_id: { 'last_seen': time, 'username': name } } → store.clients()
 CLIENT_TIMEOUT = 30  # 30초 미활동 클라이언트 정리
+PLAYER_TIMEOUT = 10.0  # 10초 미접속 플레이어는 방에서 제거
+REAPER_INTERVAL = 1.0  # 만료 정리/턴 타이머 스레드 주기 (초)
+TURN_SECONDS = 30  # 턴 제한 시간
+TURN_GRACE = 2.0  # 접속 중인 클라이언트가 먼저 자동 롤을 하도록 서버는 조금 늦게 개입
+SYSTEM_SAMPLE_INTERVAL = 2.0  # 시스템 상태 수집 주기 (초)
+SYSTEM_HISTORY_SIZE = 300  # 보관할 시스템 상태 샘플 수 (2초 × 300 = 10분)
+RECOMMEND_RATE = 2.0  # 클라이언트별 /api/recommend 허용량 (초당)
+RECOMMEND_BURST = 6   # 클라이언트별 순간 허용량
+ENGINE_CONCURRENCY = max(2, os.cpu_count() or 2)  # 동시에 돌 수 있는 엔진 계산 수
+SNAPSHOT_FILE = os.environ.get('YACHT_SNAPSHOT_FILE', 'room_snapshot.jsonl')  # 빈 값이면 스냅샷 끔
+SNAPSHOT_INTERVAL = float(os.environ.get('YACHT_SNAPSHOT_INTERVAL', '2.0'))  # 바뀐 방 저장 주기 (초)
+EVENT_LOG_DIR = os.environ.get('YACHT_EVENT_LOG_DIR', 'events')  # 방 이벤트 로그 위치, 빈 값이면 끔
+MATCH_TIMEOUT = 30.0  # 이 시간 동안 매칭 대기(wait) 요청이 없으면 대기열에서 제외 (초)
+MATCH_WAIT_MAX = 25.0  # /api/matchmaking/wait 한 번에 붙잡고 있는 최대 시간 (초)
+
+# 마감 시각 인덱스: 갱신은 O(log n), 정리는 백그라운드 스레드 하나가 담당
+lobby_expiry = expiry.ExpiryIndex()   # key: client_id
+player_expiry = expiry.ExpiryIndex()  # key: (room code, username)
+turn_timers = expiry.ExpiryIndex()    # key: room code, 마감: turn_start_time + TURN_SECONDS + TURN_GRACE
+
+# 접속자 상태 인덱스 (/api/online-users), 하트비트/방 입퇴장/만료 때 갱신
+presence = PresenceIndex()
+
+# 자동 매칭 대기열 (짝지어지면 _start_match 로 방 생성), 대기열은 이 프로세스 안에만 있으므로
+# 공유 상태 서비스(여러 워커)를 쓸 때는 /api/matchmaking/enqueue 를 막음
+matchmaker = MatchQueue(lambda host, guest: _start_match(host, guest), MATCH_TIMEOUT)
+
+# 방 상태 변경 이벤트 로그 (event_log.py), 모든 호출은 방 락 안에서
+event_log = EventLog(EVENT_LOG_DIR) if EVENT_LOG_DIR else None
+if event_log:
+    event_log.start()
+    atexit.register(event_log.flush)
+
+# --- 메트릭 ---
+HTTP_REQUESTS = metrics.counter('yacht_http_requests_total', 'HTTP requests', ('route', 'method', 'status'))
+HTTP_SECONDS = metrics.histogram('yacht_http_request_duration_seconds', 'HTTP request latency', ('route', 'method'))
+HTTP_IN_FLIGHT = metrics.gauge('yacht_http_requests_in_flight', 'requests currently being handled')
+ENGINE_SECONDS = metrics.histogram('yacht_engine_solve_seconds', 'yacht_engine.solve_best_move duration',
+                                   ('rolls_left', 'open_categories'))
+RECOMMEND_SHED = metrics.counter('yacht_recommend_shed_total',
+                                 '/api/recommend requests answered without running the engine', ('reason',))
+# 라벨 값은 고정된 집합으로만 (요청 값을 그대로 쓰면 시계열이 끝없이 늘어남)
+HTTP_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS')
+MAX_ROLLS = 3
+metrics.gauge_func('yacht_rooms', 'active rooms', lambda: len(rooms))
+metrics.gauge_func('yacht_lobby_clients', 'lobby clients seen within CLIENT_TIMEOUT', lambda: store.client_count())
+metrics.gauge_func('yacht_matchmaking_waiting', 'players waiting in the matchmaking queue', lambda: len(matchmaker))
+
+@app.before_request
+def _metrics_start():
+    g.metrics_start = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
 
-# 캐시 방지 설정
+@app.after_request
+def _metrics_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+@app.teardown_request
+def _metrics_finish(exc):
+    # 처리되지 않은 예외로 끝난 요청은 after_request 를 거치지 않을 수 있으므로 (debug/PROPAGATE_EXCEPTIONS)
+    # 기록은 항상 여기서 하고, 응답 상태를 못 받았으면 500 으로 센다
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return
+    HTTP_IN_FLIGHT.dec()
+    status = 500 if exc is not None else g.pop('metrics_status', 500)
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method = request.method if request.method in HTTP_METHODS else 'other'
+    HTTP_SECONDS.observe(time.perf_counter() - start, route, method)
+    HTTP_REQUESTS.inc(route, method, str(status))
+
+# 요청 프로파일링 (YACHT_PROFILE* 환경 변수가 없으면 훅을 등록하지 않음)
+request_profiler = profiling.RequestProfiler.from_env()
+request_profiler.init_app(app)
+
+# 캐시 방지 설정 (API 응답만, 페이지/정적 파일은 assets 에서 캐시 헤더 지정)
 @app.after_request
 def add_no_cache_headers(response):
+    if not request.path.startswith('/api/') and request.path != '/metrics':
+        return response
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, private'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
     return response
 
-def _default_room_state():
-    return {
-        "dice": [1, 1, 1, 1, 1],
-        "kept": [0, 0, 0, 0, 0],
-        "rolls_left": 3,
-        "scores": {},
-        "player_dice": {},
-        "player_kept": {},
-        "player_rolls_left": {},
-        "turn": None,
-        "turn_start_time": None,
-        "game_over": False,
-        "ai_msg": "AI: 새 게임을 시작하세요",
-        "version": 0,
-        "updated_by": None,
-    }
-
 def _score_total(card):
     card = card or []
     card = (card + [None] * 12)[:12]
@@ -49,18 +132,227 @@ def _score_total(card):
     lower = sum((v or 0) for v in card[6:])
     return upper + bonus + lower
 
+def _solve_best_move(dice, rolls_left, open_categories):
+    start = time.perf_counter()
+    result = yacht_engine.solve_best_move(dice, rolls_left, open_categories)
+    ENGINE_SECONDS.observe(time.perf_counter() - start,
+                           str(rolls_left) if rolls_left in range(MAX_ROLLS + 1) else 'other',
+                           str(len(open_categories)) if len(open_categories) <= NUM_CATEGORIES else 'other')
+    return result
+
+# GET /api/rooms/<code> 본문 캐시 (방별 마지막 version)
+room_payloads = RoomPayloadCache()
+
+# 굴림 직후 /api/recommend 가 바로 따라오므로 새 주사위에 대한 추천을 미리 계산
+speculative_solver = SpeculativeSolver(_solve_best_move)
+speculative_solver.start()
+
+# /api/recommend 부하 제어: 클라이언트별 토큰 버킷 + 엔진 동시 실행 수 제한
+recommend_limiter = TokenBucketLimiter(RECOMMEND_RATE, RECOMMEND_BURST)
+engine_slots = ConcurrencyLimit(ENGINE_CONCURRENCY)
+
+def _speculate(code, state):
+    """굴림 후 state 로 턴 플레이어의 추천을 백그라운드 계산 대기열에 넣음"""
+    card = state.scorecard(state.turn) or []
+    open_categories = [i for i, score in enumerate(card) if score is None]
+    speculative_solver.submit(code, state.version, list(state.dice), state.rolls_left, open_categories)
+
+def _remove_player(code, room, username):
+    # 공개된 튜플/state는 수정하지 않고 새 객체로 교체 (읽는 쪽 스냅샷 보호)
+    room.players = tuple(p for p in room.players if p != username)
+    room.state = room.state.replace(players=room.players)
+    presence.leave_room(username, code)
+
+def _touch_player(code, room, username, now):
+    room.player_last_seen[username] = now
+    player_expiry.touch((code, username), now + PLAYER_TIMEOUT)
+
+def _reap_expired(now=None):
+    """만료된 로비 클라이언트와 방 플레이어 정리"""
+    now = now or time.time()
+
+    for cid in lobby_expiry.pop_expired(now):
+        if store.expire_client(cid, now - CLIENT_TIMEOUT):
+            presence.client_gone(cid)
+
+    matchmaker.reap(now)
+
+    for code, username in player_expiry.pop_expired(now):
+        try:
+            _reap_player(code, username, now)
+        except Exception as e:
+            # 마감은 이미 꺼냈으므로 이 플레이어만 나중에 다시 시도
+            print(f"player reap error ({code}, {username}): {e}")
+            player_expiry.touch((code, username), now + PLAYER_TIMEOUT)
+
+def _reap_player(code, username, now):
+    with rooms.locked(code) as room:
+        if not room or username not in room.players:
+            return
+        last_seen = room.player_last_seen.get(username, 0)
+        if last_seen >= now - PLAYER_TIMEOUT:
+            # 정리 직전에 다시 접속한 경우
+            player_expiry.touch((code, username), last_seen + PLAYER_TIMEOUT)
+            return
+        _remove_player(code, room, username)
+        _schedule_turn(code, room)
+        if event_log:
+            event_log.leave(code, username, 0, now)
+        if not room.players:
+            rooms.pop(code)
+            room_payloads.discard(code)
+            if event_log:
+                event_log.close(code, now)
+
+def _schedule_turn(code, room, state=None):
+    """방 state 가 바뀔 때마다 호출: 굴림이 남은 진행 중 턴이면 마감 시각 등록 (state 를 주면 room.state 대신 사용)"""
+    state = state or room.state
+    if state.turn_start_time and state.rolls_left > 0 and not state.game_over and len(room.players) >= 2:
+        turn_timers.touch(code, state.turn_start_time + TURN_SECONDS + TURN_GRACE)
+    else:
+        turn_timers.discard(code)
+
+def _int_list(values, allowed, length=5):
+    """length 개의 int(bool 제외)가 모두 allowed 안에 있는 list 인지"""
+    return (isinstance(values, list) and len(values) == length
+            and all(type(v) is int and v in allowed for v in values))
+
+def _valid_sync(data):
+    """sync 요청 본문 검사 (보낸 항목만)"""
+    if data.get("dice") is not None and not _int_list(data["dice"], range(1, 7)):
+        return False
+    if data.get("kept") is not None and not _int_list(data["kept"], (0, 1)):
+        return False
+    if "rolls_left" in data and not (type(data["rolls_left"]) is int and 0 <= data["rolls_left"] <= 3):
+        return False
+    scores = data.get("scores")
+    if scores is not None:
+        if not isinstance(scores, dict):
+            return False
+        for card in scores.values():
+            if card is not None and not (
+                    isinstance(card, list) and len(card) == NUM_CATEGORIES
+                    and all(v is None or (type(v) is int and v >= 0) for v in card)):
+                return False
+    return True
+
+def _roll_state(state, username, kept, now):
+    """kept 가 아닌 주사위를 굴린 새 state 반환 (roll_dice 와 턴 타이머 공용)"""
+    kept = dice_array(kept)
+    new_dice = dice_array(state.dice)
+    for i in range(5):
+        if not kept[i]:
+            new_dice[i] = secrets.randbelow(6) + 1
+
+    return state.replace(
+        player_states=state.with_player(username, dice=new_dice, kept=kept),
+        dice=new_dice,
+        kept=kept,
+        rolls_left=state.rolls_left - 1,
+        version=state.version + 1,
+        turn_start_time=now,
+    )
+
+def _fire_turn_timers(now=None):
+    """마감이 지난 턴은 현재 Keep 상태 그대로 자동 롤 (클라이언트 폴링 없이도 진행)"""
+    now = now or time.time()
+    for code in turn_timers.pop_expired(now):
+        try:
+            _fire_turn_timer(code, now)
+        except Exception as e:
+            # 마감은 이미 꺼냈으므로 이 방만 한 턴 뒤에 다시 시도 (그 사이 state 가 바뀌었으면 거기서 재등록)
+            print(f"turn timer error ({code}): {e}")
+            turn_timers.touch(code, now + TURN_SECONDS)
+
+def _fire_turn_timer(code, now):
+    with rooms.locked(code) as room:
+        if room is None:
+            return
+        state = room.state
+        start = state.turn_start_time
+        if start and start + TURN_SECONDS + TURN_GRACE > now:
+            # 그 사이 굴림/턴 변경이 있었음
+            _schedule_turn(code, room)
+            return
+        if not start or state.rolls_left <= 0 or state.game_over or len(room.players) < 2:
+            return
+        turn = state.turn
+        player = state.player_states.get(turn)
+        kept = player.kept if player is not None and player.kept is not None else state.kept
+        room.state = _roll_state(state, turn, kept, now)
+        room.last_update = now
+        if event_log:
+            event_log.roll(code, turn, room.state, now)
+        _schedule_turn(code, room)
+        _speculate(code, room.state)
+
+def _reaper_loop():
+    while True:
+        time.sleep(REAPER_INTERVAL)
+        # 한쪽이 실패해도 다른 쪽은 계속 돌도록 따로 감쌈
+        try:
+            _reap_expired()
+        except Exception as e:
+            print(f"reaper error: {e}")
+        try:
+            _fire_turn_timers()
+        except Exception as e:
+            print(f"turn timer error: {e}")
+
+_reaper_started = False
+
+def start_reaper():
+    global _reaper_started
+    if _reaper_started:
+        return
+    _reaper_started = True
+    threading.Thread(target=_reaper_loop, name='expiry-reaper', daemon=True).start()
+
+start_reaper()
+
+def _restore_room(code, room, shift):
+    """스냅샷에서 읽은 방의 시각을 지금 기준으로 옮기고 만료/턴 타이머 재등록"""
+    room.created_at += shift
+    room.last_update += shift
+    if room.state.turn_start_time:
+        room.state = room.state.replace(turn_start_time=room.state.turn_start_time + shift)
+    last_seen = room.player_last_seen
+    for username in room.players:
+        last_seen[username] = last_seen[username] + shift if username in last_seen else time.time()
+        player_expiry.touch((code, username), last_seen[username] + PLAYER_TIMEOUT)
+        presence.join_room(username, code)
+    _schedule_turn(code, room)
+
+# 진행 중인 방 스냅샷: 재시작해도 게임이 이어지도록 (프로세스 내 저장소일 때만)
+# debug 리로더의 감시 프로세스(WERKZEUG_RUN_MAIN 없음)는 요청을 받지 않으므로 건너뜀
+room_snapshots = None
+if (SNAPSHOT_FILE and LOCAL_STATE
+        and not (__name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true')):
+    room_snapshots = RoomSnapshotter(rooms, SNAPSHOT_FILE, interval=SNAPSHOT_INTERVAL)
+    restored = room_snapshots.restore(_restore_room)
+    if restored:
+        print(f"restored {restored} rooms from {SNAPSHOT_FILE}")
+    room_snapshots.start()
+    atexit.register(room_snapshots.snapshot)
+
+# 시스템 상태는 백그라운드 스레드 하나가 수집하고 /api/system-status 는 마지막 값만 반환
+system_sampler = SystemSampler(
+    lambda: {"online_count": store.client_count(), "active_rooms": len(rooms)},
+    interval=SYSTEM_SAMPLE_INTERVAL, size=SYSTEM_HISTORY_SIZE)
+system_sampler.start()
+
 # --- 라우트 (페이지) ---
 @app.route('/')
 def index():
-    return render_template('lobby.html')
+    return pages.serve('lobby.html')
 
 @app.route('/game/single')
 def game_single():
-    return render_template('single-game.html')
+    return pages.serve('single-game.html')
 
 @app.route('/game/multi')
 def game_multi():
-    return render_template('multi-game.html')
+    return pages.serve('multi-game.html')
 
 # --- API ---
 
@@ -74,44 +366,29 @@ def lobby_heartbeat():
         if not client_id:
             return jsonify({"error": "client_id required"}), 400
         
-        # 접속 정보 갱신
-        lobby_clients[client_id] = {
-            'last_seen': time.time(),
-            'username': username
-        }
-        
-        # 만료된 클라이언트 정리
+        # 접속 정보 갱신 (만료 정리는 reaper 스레드가 담당)
         now = time.time()
-        to_remove = []
-        for cid, info in lobby_clients.items():
-            last_seen = info['last_seen'] if isinstance(info, dict) else info
-            if now - last_seen > CLIENT_TIMEOUT:
-                to_remove.append(cid)
+        store.touch_client(client_id, username, now)
+        presence.client_seen(client_id, username)
+        lobby_expiry.touch(client_id, now + CLIENT_TIMEOUT)
         
-        for cid in to_remove:
-            del lobby_clients[cid]
-        
-        return jsonify({"status": "ok", "active_clients": len(lobby_clients)})
+        return jsonify({"status": "ok", "active_clients": store.client_count()})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# [추가된 API] 로비 유저 상태(게임중/대기중) 통합 반환
-@app.route('/api/online-users', methods=['GET'])
-def online_users():
-    now = time.time()
-    
-    # 1. 대기실 유저 (Heartbeat 기준)
+def _scan_online_users():
+    """저장소 전체를 훑어 접속자 목록 생성 (공유 상태 서비스를 쓸 때)"""
+    # 1. 대기실 유저 (Heartbeat 기준, 만료된 클라이언트는 reaper가 정리)
     lobby = {}
-    for cid, info in lobby_clients.items():
-        if isinstance(info, dict) and now - info['last_seen'] <= CLIENT_TIMEOUT:
-            uname = info.get('username', '알 수 없음')
-            if uname:
-                lobby[uname] = {'status': '대기중'}
+    for cid, info in store.clients():
+        uname = info.get('username', '알 수 없음')
+        if uname:
+            lobby[uname] = {'status': '대기중'}
 
     # 2. 게임중 유저 (Rooms 기준)
     playing = {}
     for code, room in rooms.items():
-        for p in room.get('players', []):
+        for p in room.players:
             if p:
                 playing[p] = {'status': '게임중', 'room': code}
 
@@ -128,52 +405,60 @@ def online_users():
             entry['room'] = meta['room']
         result.append(entry)
         
-    return jsonify(result)
+    return result
+
+# [추가된 API] 로비 유저 상태(게임중/대기중) 통합 반환
+# ?since=<version> 을 주면 그 뒤로 바뀐 유저만 {"version", "changed", "removed"} 로 반환
+# (기록이 모자라면 {"version", "full": true, "users"})
+@app.route('/api/online-users', methods=['GET'])
+def online_users():
+    if not LOCAL_STATE:
+        return jsonify(_scan_online_users())
+
+    since = request.args.get('since', type=int)
+    if since is None:
+        version, body = presence.encoded()
+        resp = Response(body, content_type='application/json')
+        resp.headers['X-Presence-Version'] = str(version)
+        return resp
+
+    changes = presence.changes_since(since)
+    if changes is None:
+        version, users = presence.snapshot()
+        return jsonify({"version": version, "full": True, "users": users})
+    version, changed, removed = changes
+    return jsonify({"version": version, "changed": changed, "removed": removed})
+
+@app.route('/api/online-users/<username>', methods=['GET'])
+def online_user(username):
+    if LOCAL_STATE:
+        entry = presence.status(username)
+    else:
+        entry = next((u for u in _scan_online_users() if u['username'] == username), None)
+    if entry is None:
+        return jsonify({"username": username, "status": "오프라인"}), 404
+    return jsonify(entry)
 
 # 기존 호환성 유지용 (lobby_users)
 @app.route('/api/lobby-users', methods=['GET'])
 def lobby_users():
-    now = time.time()
     users = []
-    for cid, info in lobby_clients.items():
-        if isinstance(info, dict) and now - info['last_seen'] <= CLIENT_TIMEOUT:
-            users.append({
-                "client_id": cid,
-                "username": info.get('username', '익명')
-            })
+    for cid, info in store.clients():
+        users.append({
+            "client_id": cid,
+            "username": info.get('username', '익명')
+        })
     return jsonify(users)
 
 @app.route('/api/system-status')
 def system_status():
     try:
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        
-        now = time.time()
-        active_count = 0
-        to_remove = []
-        
-        for cid, info in lobby_clients.items():
-            try:
-                last_seen = info['last_seen'] if isinstance(info, dict) else info
-                if now - last_seen <= CLIENT_TIMEOUT:
-                    active_count += 1
-                else:
-                    to_remove.append(cid)
-            except:
-                to_remove.append(cid)
-                
-        for cid in to_remove:
-            lobby_clients.pop(cid, None)
-            
-        return jsonify({
-            "cpu_percent": round(cpu_percent, 1),
-            "memory_percent": round(memory.percent, 1),
-            "memory_used_gb": round(memory.used / (1024**3), 2),
-            "memory_total_gb": round(memory.total / (1024**3), 2),
-            "online_count": active_count,
-            "active_rooms": len(rooms)
-        })
+        result = dict(system_sampler.latest())
+        # ?history=N: 스파크라인용 최근 N개 샘플 (최대 SYSTEM_HISTORY_SIZE)
+        history = request.args.get('history', type=int)
+        if history:
+            result["history"] = system_sampler.history(history)
+        return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -184,24 +469,86 @@ def recommend():
         dice = data.get('dice', [])
         rolls_left = data.get('rolls_left', 0)
         scorecard = data.get('scorecard', []) 
+        if type(rolls_left) is not int or not 0 <= rolls_left <= MAX_ROLLS:
+            return jsonify({"error": f"rolls_left 는 0~{MAX_ROLLS}", "message": "잘못된 요청"}), 400
+        if not isinstance(scorecard, list) or len(scorecard) > NUM_CATEGORIES:
+            return jsonify({"error": f"scorecard 는 최대 {NUM_CATEGORIES}칸", "message": "잘못된 요청"}), 400
         open_categories = [i for i, score in enumerate(scorecard) if score is None]
         
-        if not open_categories or rolls_left < 0:
+        if not open_categories:
             return jsonify({"message": "추천 불가", "keep_indices": [], "dice_recommendations": []})
-
-        result = yacht_engine.solve_best_move(dice, rolls_left, open_categories)
+        try:
+            yacht_engine.check_dice(dice)
+        except ValueError as e:
+            return jsonify({"error": str(e), "message": "잘못된 주사위"}), 400
+
+        # 굴림 때 미리 계산해 둔(또는 같은 상태로 이미 계산한) 결과가 있으면 그대로 사용
+        limited = not recommend_limiter.allow(request.remote_addr)
+        result = speculative_solver.lookup(dice, rolls_left, open_categories, wait=not limited)
+        if result is not None:
+            return jsonify(result)
+
+        # 한도 초과 시 대기열에 쌓지 않고 간이 추천으로 응답
+        if limited:
+            RECOMMEND_SHED.inc('rate_limited')
+            return jsonify(dict(yacht_engine.quick_move(dice, rolls_left, open_categories), degraded=True))
+        if not engine_slots.try_acquire():
+            RECOMMEND_SHED.inc('concurrency')
+            return jsonify(dict(yacht_engine.quick_move(dice, rolls_left, open_categories), degraded=True))
+        try:
+            result = _solve_best_move(dice, rolls_left, open_categories)
+        finally:
+            engine_slots.release()
+        speculative_solver.remember(dice, rolls_left, open_categories, result)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e), "message": "AI 추천 오류"}), 500
 
+@app.route('/api/analyze', methods=['POST'])
+def analyze():
+    """keep 별·카테고리별 점수 기대값/분산/분포 (keep_indices 를 안 주면 32가지 keep 전부)"""
+    data = request.get_json(silent=True) or {}
+    if 'open_categories' in data:
+        open_categories = data['open_categories']
+    else:
+        open_categories = [i for i, score in enumerate(data.get('scorecard') or [None] * 12) if score is None]
+    try:
+        result = yacht_engine.analyze(data.get('dice') or [], data.get('rolls_left', 0), open_categories,
+                                      data.get('keep_indices'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 # --- 리더보드 & 게임 데이터 ---
+def _leaderboard_window():
+    """?window=day|week|month (없거나 all 이면 전체 기간 None), 잘못된 값이면 ValueError"""
+    window = request.args.get('window') or 'all'
+    if window == 'all':
+        return None
+    if window not in leaderboards.WINDOWS:
+        raise ValueError(window)
+    return window
+
 @app.route('/api/leaderboard', methods=['GET'])
+@app.route('/api/leaderboard/multi', methods=['GET'])
 def leaderboard():
-    return jsonify(database.get_leaderboard())
+    try:
+        window = _leaderboard_window()
+    except ValueError:
+        return jsonify({"error": "window 는 day/week/month/all 중 하나"}), 400
+    return jsonify(database.get_leaderboard(window))
 
 @app.route('/api/leaderboard/single', methods=['GET'])
 def leaderboard_single():
-    return jsonify(database.get_single_leaderboard())
+    try:
+        window = _leaderboard_window()
+    except ValueError:
+        return jsonify({"error": "window 는 day/week/month/all 중 하나"}), 400
+    return jsonify(database.get_single_leaderboard(window))
 
 @app.route('/api/leaderboard/single', methods=['POST'])
 def leaderboard_single_post():
@@ -213,15 +560,18 @@ def leaderboard_single_post():
     database.save_single_leaderboard(username, int(score))
     return jsonify({'success': True})
 
-@app.route('/api/leaderboard/multi', methods=['GET'])
-def leaderboard_multi():
-    return jsonify(database.get_leaderboard())
-
 @app.route('/api/leaderboard/reset', methods=['POST'])
 def reset_leaderboard():
     database.reset_leaderboard()
     return jsonify({"status": "reset"})
 
+@app.route('/api/users/<name>/stats', methods=['GET'])
+def user_stats(name):
+    stats = database.get_user_stats(name)
+    if stats is None:
+        return jsonify({"error": "기록 없음"}), 404
+    return jsonify(stats)
+
 @app.route('/api/save-game', methods=['POST'])
 def save_game():
     try:
@@ -238,251 +588,295 @@ def _generate_room_code(length: int = 6) -> str:
 
 @app.route('/api/rooms', methods=['GET'])
 def list_rooms():
-    now = time.time()
-    to_delete = []
-    
-    for code, info in list(rooms.items()):
-        pls = info.setdefault('player_last_seen', {})
-        stale_threshold = 10.0
-        
-        stale_players = [p for p in list(info.get('players', [])) 
-                         if (p in pls) and (pls.get(p, 0) < now - stale_threshold)]
-        
-        if stale_players:
-            for p in stale_players:
-                if p in info['players']: info['players'].remove(p)
-            info['state']['players'] = info['players']
-            
-        if len(info.get('players', [])) == 0:
-            to_delete.append(code)
-            
-    for code in to_delete:
-        del rooms[code]
-
+    # 오래된 플레이어/빈 방 정리는 reaper 스레드가 담당
     return jsonify([
         {
             "code": code,
-            "host": info["host"],
-            "players": info["players"],
-            "status": "full" if len(info["players"]) >= 2 else "waiting",
+            "host": info.host,
+            "players": info.players,
+            "status": "full" if len(info.players) >= 2 else "waiting",
         }
-        for code, info in rooms.items() if len(info.get("players", [])) >= 1
+        for code, info in rooms.items() if len(info.players) >= 1
     ])
 
+def _open_room(username, now):
+    """username 이 방장인 새 방을 만들고 방 코드 반환"""
+    players = (username,)
+    room = Room(username, players, GameState.new_game(players), now)
+    code = _generate_room_code()
+    while not rooms.create(code, room): code = _generate_room_code()
+    with rooms.locked(code) as room:
+        if room is not None:
+            _touch_player(code, room, username, now)
+            presence.join_room(username, code)
+            if event_log:
+                event_log.create(code, username, now)
+    return code
+
+def _seat_player(code, room, username, now):
+    """방 락 안에서 username 을 두 번째 플레이어로 앉히고 새 게임 시작"""
+    room.players = room.players + (username,)
+
+    # 첫 턴은 먼저 들어와 있던 플레이어 (room.players[0])
+    room.state = GameState.new_game(room.players, turn_start_time=now,
+                                    version=room.state.version + 1, updated_by="system")
+    room.last_update = now
+    room.started_full = True
+    _touch_player(code, room, username, now)
+    _schedule_turn(code, room)
+    presence.join_room(username, code)
+    if event_log:
+        event_log.join(code, username, room.state.version, now)
+
 @app.route('/api/rooms', methods=['POST'])
 def create_room():
     username = (request.json or {}).get('username')
     if not username: return jsonify({"error": "닉네임 필요"}), 400
-    
-    code = _generate_room_code()
-    while code in rooms: code = _generate_room_code()
-        
-    base_state = _default_room_state()
-    base_state["scores"][username] = [None] * 12
-    base_state["player_dice"][username] = [1]*5
-    base_state["player_kept"][username] = [0]*5
-    base_state["player_rolls_left"][username] = 3
-    base_state["turn"] = username
-    base_state["players"] = [username]
-    
-    rooms[code] = {
-        "host": username,
-        "players": [username],
-        "observers": [],
-        "state": base_state,
-        "created_at": time.time(),
-        "last_update": time.time(),
-        "started_full": False,
-        "player_last_seen": {username: time.time()},
-    }
-    return jsonify({"code": code, "players": rooms[code]["players"]})
+
+    code = _open_room(username, time.time())
+    return jsonify({"code": code, "players": [username]})
 
 @app.route('/api/rooms/<code>/join', methods=['POST'])
 def join_room(code):
     username = (request.json or {}).get('username')
     if not username: return jsonify({"error": "닉네임 필요"}), 400
-    if code not in rooms: return jsonify({"error": "방 없음"}), 404
-        
-    room = rooms[code]
-    if username not in room["players"]:
-        if len(room["players"]) >= 2: return jsonify({"error": "방이 가득 찼습니다"}), 409
-        room["players"].append(username)
-        
-        state = _default_room_state()
-        host = room["players"][0]
-        guest = username
-        
-        state["scores"] = {host: [None]*12, guest: [None]*12}
-        state["player_dice"] = {host: [1]*5, guest: [1]*5}
-        state["player_kept"] = {host: [0]*5, guest: [0]*5}
-        state["player_rolls_left"] = {host: 3, guest: 3}
-        state["players"] = room["players"]
-        state["turn"] = host
-        state["turn_start_time"] = time.time()
-        state["version"] = (room.get("state", {}).get("version", 0)) + 1
-        state["updated_by"] = "system"
-        
-        room["state"] = state
-        room["last_update"] = time.time()
-        room["started_full"] = True
-        room.setdefault("player_last_seen", {})[username] = time.time()
+    
+    with rooms.locked(code) as room:
+        if room is None: return jsonify({"error": "방 없음"}), 404
+        if username not in room.players:
+            if len(room.players) >= 2: return jsonify({"error": "방이 가득 찼습니다"}), 409
+            _seat_player(code, room, username, time.time())
+        players, state, observers = room.players, room.state, room.observers
         
-    return jsonify({"code": code, "players": room["players"], "state": room["state"], "observers": room.get("observers", [])})
+    return jsonify({"code": code, "players": players, "state": state.to_dict(), "observers": observers})
 
 @app.route('/api/rooms/<code>/observe', methods=['POST'])
 def observe_room(code):
     username = (request.json or {}).get('username')
     if not username: return jsonify({"error": "닉네임 필요"}), 400
-    if code not in rooms: return jsonify({"error": "방 없음"}), 404
     
-    room = rooms[code]
-    if username in room["players"]:
-        return jsonify({"error": "이미 플레이어입니다"}), 409
-        
-    if username not in room.get("observers", []):
-        room.setdefault("observers", []).append(username)
+    with rooms.locked(code) as room:
+        if room is None: return jsonify({"error": "방 없음"}), 404
+        if username in room.players:
+            return jsonify({"error": "이미 플레이어입니다"}), 409
+            
+        if username not in room.observers:
+            room.observers = room.observers + (username,)
+            if event_log:
+                event_log.observe(code, username, time.time())
+        players, state, observers = room.players, room.state, room.observers
         
-    return jsonify({"code": code, "observers": room["observers"], "players": room["players"], "state": room["state"]})
+    return jsonify({"code": code, "observers": observers, "players": players, "state": state.to_dict()})
 
 @app.route('/api/rooms/<code>', methods=['GET'])
 def get_room(code):
-    room = rooms.get(code)
-    if not room: return jsonify({"error": "방 없음"}), 404
-    
     now = time.time()
     u = request.args.get('u')
-    if u and (u in room.get('players', [])):
-        room.setdefault('player_last_seen', {})[u] = now
-        room['last_update'] = now
+    
+    # 락은 참조 복사에만 잠깐 사용하고, 직렬화는 락 밖에서 수행
+    with rooms.locked(code) as room:
+        if room is None: return jsonify({"error": "방 없음"}), 404
+        if u and (u in room.players):
+            _touch_player(code, room, u, now)
+            room.last_update = now
+        host, players, observers, state = room.host, room.players, room.observers, room.state
 
-    state = room.get("state", _default_room_state())
     turn_left = None
-    if state.get("turn_start_time"):
-        turn_left = max(0, 30 - int(now - state["turn_start_time"]))
-    state["turn_left_seconds"] = turn_left
+    if state.turn_start_time:
+        turn_left = max(0, 30 - int(now - state.turn_start_time))
     
-    p1 = room["host"]
+    p1 = host
     p2 = None
-    for p in room["players"]:
+    for p in players:
         if p != p1:
             p2 = p
             break
-            
-    return jsonify({
-        "code": code,
-        "host": room["host"],
-        "players": room["players"],
-        "observers": room.get("observers", []),
-        "state": state,
+
+    # 같은 version 의 본문은 한 번만 인코딩하고 turn_left_seconds 만 붙여서 보냄
+    payload = room_payloads.get(code, {
+        "host": host,
+        "players": players,
+        "observers": observers,
         "player1": p1,
-        "player2": p2
-    })
+        "player2": p2,
+    }, state)
+    if payload.compressible and request.accept_encodings.best_match(('gzip', 'identity')) == 'gzip':
+        resp = Response(payload.gzip_body(turn_left), content_type='application/json')
+        resp.headers['Content-Encoding'] = 'gzip'
+    else:
+        resp = Response(payload.body(turn_left), content_type='application/json')
+    resp.vary.add('Accept-Encoding')
+    return resp
 
 @app.route('/api/rooms/<code>/sync', methods=['POST'])
 def sync_room(code):
-    room = rooms.get(code)
-    if not room: return jsonify({"error": "방 없음"}), 404
     data = request.json or {}
     username = data.get('username')
-    if username not in room["players"]: return jsonify({"error": "참가자 아님"}), 403
-
-    state = room.get("state", _default_room_state())
-    if state.get("turn") and state["turn"] != username and not data.get("game_over"):
-        return jsonify({"error": "상대 턴"}), 403
-
-    dice = data.get("dice", state["dice"])
-    kept = data.get("kept", state["kept"])
-    rolls_left = data.get("rolls_left", state["rolls_left"])
-
-    state.setdefault("player_dice", {})[username] = dice
-    state.setdefault("player_kept", {})[username] = kept
-    state.setdefault("player_rolls_left", {})[username] = rolls_left
-
-    prev_turn = state.get("turn")
-    new_turn = data.get("turn", state.get("turn"))
     
-    turn_start_time = state.get("turn_start_time")
-    if (prev_turn != new_turn) or (rolls_left == 3 and state.get("rolls_left") != 3):
-        turn_start_time = time.time()
-
-    new_state = {
-        "dice": dice,
-        "kept": kept,
-        "rolls_left": rolls_left,
-        "scores": data.get("scores", state["scores"]),
-        "player_dice": state.get("player_dice", {}),
-        "player_kept": state.get("player_kept", {}),
-        "player_rolls_left": state.get("player_rolls_left", {}),
-        "turn": new_turn,
-        "turn_start_time": turn_start_time,
-        "game_over": data.get("game_over", state["game_over"]),
-        "players": state.get("players", room["players"]),
-        "version": state.get("version", 0) + 1,
-        "updated_by": username,
-    }
-    room["state"] = new_state
-    room["last_update"] = time.time()
-    return jsonify({"state": new_state})
+    with rooms.locked(code) as room:
+        if room is None: return jsonify({"error": "방 없음"}), 404
+        if username not in room.players: return jsonify({"error": "참가자 아님"}), 403
+
+        state = room.state
+        if state.turn and state.turn != username and not data.get("game_over"):
+            return jsonify({"error": "상대 턴"}), 403
+        if not _valid_sync(data):
+            return jsonify({"error": "잘못된 상태"}), 400
+
+        try:
+            dice = state.dice if data.get("dice") is None else dice_array(data["dice"])
+            kept = state.kept if data.get("kept") is None else dice_array(data["kept"])
+            player_states = dict(state.player_states)
+            scores = data.get("scores")
+            if scores is not None:
+                # 점수판은 클라이언트가 보낸 것으로 통째로 교체 (바뀌지 않은 플레이어 객체는 재사용)
+                for name in set(player_states) | set(scores):
+                    card = scores.get(name)
+                    card = None if card is None else scorecard_array(card)
+                    current = player_states.get(name) or PlayerState()
+                    if card != current.scores:
+                        player_states[name] = current.replace(scores=card)
+        except (TypeError, ValueError, OverflowError, AttributeError):
+            return jsonify({"error": "잘못된 상태"}), 400
+        rolls_left = data.get("rolls_left", state.rolls_left)
+        player_states[username] = (player_states.get(username) or PlayerState()).replace(
+            dice=dice, kept=kept, rolls_left=rolls_left)
+
+        prev_turn = state.turn
+        new_turn = data.get("turn", state.turn)
+        
+        turn_start_time = state.turn_start_time
+        if (prev_turn != new_turn) or (rolls_left == 3 and state.rolls_left != 3):
+            turn_start_time = time.time()
+
+        new_state = GameState(
+            state.players,
+            player_states,
+            dice,
+            kept,
+            rolls_left,
+            new_turn,
+            turn_start_time,
+            data.get("game_over", state.game_over),
+            state.ai_msg,
+            state.version + 1,
+            username,
+        )
+        _schedule_turn(code, room, new_state)
+        room.state = new_state
+        room.last_update = time.time()
+        if event_log:
+            event_log.sync(code, username, state, new_state, room.last_update)
+    return jsonify({"state": new_state.to_dict()})
 
 @app.route('/api/rooms/<code>/roll', methods=['POST'])
 def roll_dice(code):
-    room = rooms.get(code)
-    if not room: return jsonify({"error": "방 없음"}), 404
     data = request.json or {}
     username = data.get('username')
     
-    state = room.get("state", _default_room_state())
-    if state.get("turn") and state["turn"] != username:
-        return jsonify({"error": "상대 턴"}), 403
-    
-    rolls_left = state.get("rolls_left", 3)
-    if rolls_left <= 0: return jsonify({"error": "남은 굴림 없음"}), 400
-    
-    kept = data.get("kept", state["kept"])
-    new_dice = state["dice"][:]
-    for i in range(5):
-        if not kept[i]:
-            new_dice[i] = secrets.randbelow(6) + 1
-            
-    state.setdefault("player_dice", {})[username] = new_dice
-    state.setdefault("player_kept", {})[username] = kept
-    state["dice"] = new_dice
-    state["kept"] = kept
-    state["rolls_left"] = rolls_left - 1
-    state["version"] = state.get("version", 0) + 1
-    state["turn_start_time"] = time.time()
-    
-    room["state"] = state
-    room["last_update"] = time.time()
+    with rooms.locked(code) as room:
+        if room is None: return jsonify({"error": "방 없음"}), 404
+        
+        state = room.state
+        if state.turn and state.turn != username:
+            return jsonify({"error": "상대 턴"}), 403
+        
+        if state.rolls_left <= 0: return jsonify({"error": "남은 굴림 없음"}), 400
+        
+        kept = data.get("kept")
+        try:
+            state = _roll_state(state, username, state.kept if kept is None else kept, time.time())
+        except (TypeError, ValueError, OverflowError, IndexError):
+            return jsonify({"error": "잘못된 keep"}), 400
+        
+        room.state = state
+        room.last_update = time.time()
+        _schedule_turn(code, room)
+        if event_log:
+            event_log.roll(code, username, state, room.last_update)
     
-    return jsonify({"dice": new_dice, "rolls_left": state["rolls_left"], "state": state})
+    _speculate(code, state)
+    return jsonify({"dice": list(state.dice), "rolls_left": state.rolls_left, "state": state.to_dict()})
 
 @app.route('/api/rooms/<code>/leave', methods=['POST', 'GET'])
 def leave_room(code):
-    room = rooms.get(code)
-    if not room: return jsonify({"error": "방 없음"}), 404
     data = request.get_json(silent=True) or {}
     username = data.get('username') or request.args.get('username')
+    result = None
     
-    if username in room["players"]:
-        room["players"].remove(username)
-        state = room.get("state", _default_room_state())
-        
-        if len(room["players"]) > 0:
-            winner = room["players"][0]
-            loser = username
-            state["game_over"] = True
-            state["version"] += 1
-            scores = state.get("scores", {})
-            database.save_game_result(winner, _score_total(scores.get(winner)), loser, _score_total(scores.get(loser)))
-            room["state"] = state
-            return jsonify({"status": "left", "players": room["players"]})
-
-    if len(room.get("players", [])) == 0:
-        rooms.pop(code, None)
+    with rooms.locked(code) as room:
+        if room is None: return jsonify({"error": "방 없음"}), 404
+        if username in room.players:
+            _remove_player(code, room, username)
+            player_expiry.discard((code, username))
+            
+            if len(room.players) > 0:
+                winner = room.players[0]
+                loser = username
+                state = room.state.replace(game_over=True, version=room.state.version + 1)
+                room.state = state
+                _schedule_turn(code, room)
+                result = (winner, _score_total(state.scorecard(winner)), loser, _score_total(state.scorecard(loser)))
+                players = room.players
+            if event_log:
+                event_log.leave(code, username, room.state.version if result else 0, time.time())
+
+        if len(room.players) == 0:
+            rooms.pop(code)
+            turn_timers.discard(code)
+            room_payloads.discard(code)
+            if event_log:
+                event_log.close(code, time.time())
+
+    # 파일 저장은 방 락을 놓은 뒤 수행
+    if result:
+        database.save_game_result(*result)
+        return jsonify({"status": "left", "players": players})
         
     return jsonify({"status": "left", "players": []})
 
+# --- 자동 매칭 ---
+def _start_match(host, guest):
+    """대기열에서 짝지어진 두 사람으로 방 생성 + 참가 처리 (방 생성/참가 API 와 같은 상태로 시작)"""
+    now = time.time()
+    code = _open_room(host, now)
+    with rooms.locked(code) as room:
+        if room is not None:
+            _seat_player(code, room, guest, now)
+    return code
+
+def _matchmaking_user():
+    data = request.get_json(silent=True) or {}
+    return data.get('username') or request.args.get('username')
+
+@app.route('/api/matchmaking/enqueue', methods=['POST'])
+def matchmaking_enqueue():
+    if not LOCAL_STATE:
+        return jsonify({"error": "공유 상태 서비스 사용 중에는 자동 매칭을 지원하지 않습니다"}), 503
+    username = _matchmaking_user()
+    if not username: return jsonify({"error": "닉네임 필요"}), 400
+    return jsonify(matchmaker.enqueue(username))
+
+@app.route('/api/matchmaking/wait', methods=['GET', 'POST'])
+def matchmaking_wait():
+    """매칭될 때까지 최대 timeout 초(기본/최대 MATCH_WAIT_MAX) 붙잡고 있다가 현재 상태 반환 (long-poll)"""
+    username = _matchmaking_user()
+    if not username: return jsonify({"error": "닉네임 필요"}), 400
+    try:
+        timeout = min(max(float(request.args.get('timeout', MATCH_WAIT_MAX)), 0.0), MATCH_WAIT_MAX)
+    except ValueError:
+        return jsonify({"error": "timeout 은 초 단위 숫자"}), 400
+    result = matchmaker.wait(username, timeout)
+    if result is None:
+        return jsonify({"status": "not_queued"}), 404
+    return jsonify(result)
+
+@app.route('/api/matchmaking/cancel', methods=['POST'])
+def matchmaking_cancel():
+    username = _matchmaking_user()
+    if not username: return jsonify({"error": "닉네임 필요"}), 400
+    return jsonify({"status": "cancelled" if matchmaker.cancel(username) else "not_queued"})
+
 if __name__ == '__main__':
     print("🎲 Yacht Game Server Running on Port 8080...")
     app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""방 레지스트리 스냅샷 (재시작 후 진행 중인 게임 복구)
+
+파일은 한 줄에 방 하나인 JSON Lines 이고 뒤에 나온 기록이 앞의 기록을 덮어쓴다.
+    {"c": code, "t": 저장 시각, "r": room}   방 저장
+    {"c": code, "d": 1}                      방 삭제
+snapshot() 은 지난번 이후 바뀐 방(version/플레이어/관전자 기준)과 삭제된 방만 이어 쓰고,
+쌓인 기록이 살아 있는 방 수보다 많이 커지면 compact() 로 전체를 새로 쓴다.
+"""
+import json
+import os
+import threading
+import time
+
+from room_state import Room
+
+
+def _mark(room):
+    return (room.state.version, room.players, room.observers)
+
+
+class RoomSnapshotter:
+    def __init__(self, rooms, path, interval=2.0):
+        self.rooms = rooms
+        self.path = path
+        self.interval = interval
+        self._marks = {}    # code → 마지막으로 저장한 _mark
+        self._records = 0   # 파일에 쌓인 줄 수
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _dump_room(self, code, now):
+        """방 락을 잡고 직렬화 (player_last_seen 등은 제자리에서 갱신되므로)"""
+        with self.rooms.locked(code) as room:
+            if room is None:
+                return None, None
+            return _mark(room), json.dumps({'c': code, 't': now, 'r': room.to_dict()}, ensure_ascii=False)
+
+    def snapshot(self):
+        """바뀐 방만 파일 끝에 추가, 쓴 줄 수 반환"""
+        with self._lock:
+            now = time.time()
+            lines = []
+            seen = set()
+            for code, room in self.rooms.items():
+                seen.add(code)
+                if self._marks.get(code) == _mark(room):
+                    continue
+                mark, line = self._dump_room(code, now)
+                if line is not None:
+                    lines.append(line)
+                    self._marks[code] = mark
+            for code in [c for c in self._marks if c not in seen]:
+                lines.append(json.dumps({'c': code, 'd': 1}))
+                del self._marks[code]
+            if lines:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._records += len(lines)
+            if self._records > 2 * len(self._marks) + 1000:
+                self._compact()
+            return len(lines)
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        now = time.time()
+        tmp = self.path + '.tmp'
+        marks = {}
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for code in self.rooms.keys():
+                mark, line = self._dump_room(code, now)
+                if line is not None:
+                    f.write(line + '\n')
+                    marks[code] = mark
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._marks = marks
+        self._records = len(marks)
+
+    def restore(self, on_restore=None):
+        """파일의 방들을 레지스트리에 등록, on_restore(code, room, shift) 로 시각 보정
+
+        shift 는 저장 시각부터 지금까지 흐른 시간(초)이다. 복구한 방 수 반환.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        latest = {}
+        records = 0
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                records += 1
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # 쓰다가 끊긴 마지막 줄
+                if rec.get('d'):
+                    latest.pop(rec['c'], None)
+                else:
+                    latest[rec['c']] = rec
+        now = time.time()
+        with self._lock:
+            for code, rec in latest.items():
+                room = Room.from_dict(rec['r'])
+                if not self.rooms.create(code, room):
+                    continue
+                if on_restore:
+                    on_restore(code, room, now - rec['t'])
+                self._marks[code] = _mark(room)
+            self._records = records
+        return len(latest)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.snapshot()
+            except Exception as e:
+                print(f"snapshot error: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='room-snapshots', daemon=True)
+            self._thread.start()
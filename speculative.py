@@ -0,0 +1,135 @@
+import queue
+import threading
+from collections import OrderedDict
+
+import metrics
+
+SPEC_JOBS = metrics.counter('yacht_speculative_jobs_total', 'speculative recommend jobs by outcome', ('outcome',))
+SPEC_LOOKUPS = metrics.counter('yacht_speculative_lookups_total', '/api/recommend cache lookups', ('result',))
+
+
+def state_key(dice, rolls_left, open_categories):
+    return (tuple(dice), rolls_left, tuple(open_categories))
+
+
+class SpeculativeSolver:
+    """굴림 직후 추천 결과를 백그라운드에서 미리 계산
+
+    roll 마다 submit(room, version, ...) 으로 작업을 넣고, /api/recommend 는 lookup() 으로
+    (dice, rolls_left, open_categories) 가 같은 결과를 꺼낸다. 워커가 이미 계산 중이면 끝날 때까지 잠깐 기다리고,
+    아직 대기열에 있으면 다른 방 작업 뒤에서 기다리지 않도록 작업을 빼앗아 요청 스레드가 직접 계산하게 한다.
+    - 대기열은 max_queue 로 제한하고, 가득 차면 새 작업은 버린다.
+    - 같은 방의 version 이 이미 바뀐 작업은 계산하지 않고 버린다.
+    - 결과는 max_results 개까지 LRU 로 보관한다.
+    """
+
+    def __init__(self, solve_fn, max_queue=256, max_results=4096, workers=1, wait_timeout=2.0):
+        self._solve = solve_fn
+        self._jobs = queue.Queue(maxsize=max_queue)
+        self._max_results = max_results
+        self._wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._latest = {}         # room → 대기열/계산 중인 가장 최근 version (작업이 끝나거나 버려지면 지움)
+        self._pending = {}        # state key → threading.Event (대기열에 있거나 계산 중)
+        self._running = set()     # 워커가 계산을 시작한 state key
+        self._results = OrderedDict()
+        self._workers = workers
+        self._threads = []
+
+    def submit(self, room, version, dice, rolls_left, open_categories):
+        if not open_categories or rolls_left < 0:
+            return
+        key = state_key(dice, rolls_left, open_categories)
+        with self._lock:
+            if key in self._results or key in self._pending:
+                # 새 작업은 안 넣지만 이 방의 이전 version 작업은 stale 로 버려지도록 항목만 지움
+                self._latest.pop(room, None)
+                SPEC_JOBS.inc('duplicate')
+                return
+            event = self._pending[key] = threading.Event()
+            self._latest[room] = version
+        try:
+            self._jobs.put_nowait((room, version, key))
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(key, None)
+                if self._latest.get(room) == version:
+                    del self._latest[room]
+            event.set()
+            SPEC_JOBS.inc('dropped_full')
+
+    def _store(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self._max_results:
+            self._results.popitem(last=False)
+
+    def lookup(self, dice, rolls_left, open_categories, wait=True):
+        """미리 계산된 결과 (없으면 None → 호출한 쪽이 직접 계산), wait=False 면 계산 중이어도 기다리지 않음
+
+        wait=True 인데 작업이 아직 대기열에 있으면 그 작업은 워커가 건너뛰도록 가져오고 바로 None 을 준다.
+        """
+        key = state_key(dice, rolls_left, open_categories)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                SPEC_LOOKUPS.inc('hit')
+                return result
+            event = self._pending.get(key)
+            if wait and event is not None and key not in self._running:
+                del self._pending[key]
+                event.set()
+                SPEC_LOOKUPS.inc('taken_over')
+                return None
+        if wait and event is not None and event.wait(self._wait_timeout):
+            with self._lock:
+                result = self._results.get(key)
+            if result is not None:
+                SPEC_LOOKUPS.inc('hit_wait')
+                return result
+        SPEC_LOOKUPS.inc('miss')
+        return None
+
+    def remember(self, dice, rolls_left, open_categories, result):
+        """요청 스레드가 직접 계산한 결과도 캐시에 넣음"""
+        with self._lock:
+            self._store(state_key(dice, rolls_left, open_categories), result)
+
+    def _run(self):
+        while True:
+            room, version, key = self._jobs.get()
+            with self._lock:
+                taken = key not in self._pending  # 요청 스레드가 가져가 직접 계산함
+                stale = self._latest.get(room) != version
+                if not taken and not stale:
+                    self._running.add(key)
+            result = None
+            if taken:
+                SPEC_JOBS.inc('taken_over')
+            elif stale:
+                SPEC_JOBS.inc('dropped_stale')
+            else:
+                try:
+                    dice, rolls_left, open_categories = key
+                    result = self._solve(list(dice), rolls_left, list(open_categories))
+                    SPEC_JOBS.inc('computed')
+                except Exception as e:
+                    SPEC_JOBS.inc('error')
+                    print(f"speculative solve error: {e}")
+            with self._lock:
+                self._running.discard(key)
+                if result is not None:
+                    self._store(key, result)
+                if self._latest.get(room) == version:
+                    del self._latest[room]
+                # 가져간 뒤 같은 state 로 새로 제출된 작업은 그 작업 차례에 정리
+                event = None if taken else self._pending.pop(key, None)
+            if event is not None:
+                event.set()
+
+    def start(self):
+        while len(self._threads) < self._workers:
+            t = threading.Thread(target=self._run, name=f'speculative-{len(self._threads)}', daemon=True)
+            t.start()
+            self._threads.append(t)
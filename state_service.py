@@ -0,0 +1,114 @@
+"""공유 방/로비 상태 서비스 (room_store.RemoteStore 의 서버 쪽)
+
+여러 server.py 워커가 같은 방 상태를 보도록 하는 작은 로컬 서비스.
+요청/응답은 한 줄짜리 JSON 이고, 연결마다 스레드 하나가 처리한다.
+'lock' 으로 잡은 방 락은 같은 연결에서 'unlock' 하거나 연결이 끊기면 풀린다.
+
+    python3 state_service.py --port 7001
+    python3 state_service.py --unix /tmp/yacht-state.sock
+"""
+import argparse
+import json
+import os
+import socketserver
+
+from room_store import LocalStore
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        store = self.server.store
+        held = []  # 이 연결이 잡고 있는 (code, context manager)
+        try:
+            for line in self.rfile:
+                try:
+                    msg = json.loads(line)
+                    reply = {'ok': True, 'result': _dispatch(store, held, msg)}
+                except Exception as e:
+                    reply = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+                self.wfile.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n')
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            while held:
+                held.pop()[1].__exit__(None, None, None)
+
+
+def _dispatch(store, held, msg):
+    op = msg['op']
+    rooms = store.rooms
+    if op == 'get':
+        return rooms.get(msg['code'])
+    if op == 'lock':
+        cm = rooms.locked(msg['code'])
+        room = cm.__enter__()
+        held.append((msg['code'], cm))
+        return room
+    if op == 'unlock':
+        code, cm = held.pop()
+        if code != msg['code']:
+            held.append((code, cm))
+            raise ValueError(f'unlock order mismatch: {msg["code"]} != {code}')
+        try:
+            if msg.get('room') is not None:
+                rooms.replace(code, msg['room'])
+        finally:
+            cm.__exit__(None, None, None)
+        return None
+    if op == 'create':
+        return rooms.create(msg['code'], msg['room'])
+    if op == 'pop':
+        return rooms.pop(msg['code'])
+    if op == 'items':
+        return rooms.items()
+    if op == 'keys':
+        return rooms.keys()
+    if op == 'contains':
+        return msg['code'] in rooms
+    if op == 'len':
+        return len(rooms)
+    if op == 'touch_client':
+        return store.touch_client(msg['client_id'], msg['username'], msg['now'])
+    if op == 'expire_client':
+        return store.expire_client(msg['client_id'], msg['cutoff'])
+    if op == 'clients':
+        return store.clients()
+    if op == 'client_count':
+        return store.client_count()
+    raise ValueError(f'unknown op: {op}')
+
+
+class StateServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _Handler)
+        self.store = LocalStore()
+
+
+class UnixStateServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _Handler)
+        self.store = LocalStore()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Yacht 공유 상태 서비스')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7001)
+    parser.add_argument('--unix', help='TCP 대신 사용할 유닉스 소켓 경로')
+    args = parser.parse_args()
+
+    server = UnixStateServer(args.unix) if args.unix else StateServer((args.host, args.port))
+    where = args.unix or f'{args.host}:{args.port}'
+    print(f"🗄️  Yacht state service on {where}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import deque
+
+import psutil
+
+
+class SystemSampler:
+    """일정 주기로 CPU/메모리/접속자/방 수를 수집해 고정 크기 링 버퍼에 보관
+
+    요청 스레드는 psutil 을 호출하지 않고 latest()/history() 로 마지막 값만 읽는다.
+    counts_fn 은 {'online_count': n, 'active_rooms': m} 를 돌려주는 함수.
+    """
+
+    def __init__(self, counts_fn, interval=2.0, size=300):
+        self.interval = interval
+        self._counts_fn = counts_fn
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def sample(self):
+        """지금 값을 한 번 수집해 버퍼에 추가 (블로킹 없음)"""
+        # interval=None: 직전 호출 이후 평균 사용률을 바로 반환
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        entry = {
+            "ts": round(time.time(), 3),
+            "cpu_percent": round(cpu_percent, 1),
+            "memory_percent": round(memory.percent, 1),
+            "memory_used_gb": round(memory.used / (1024**3), 2),
+            "memory_total_gb": round(memory.total / (1024**3), 2),
+        }
+        entry.update(self._counts_fn())
+        with self._lock:
+            self._samples.append(entry)
+        return entry
+
+    def latest(self):
+        with self._lock:
+            if self._samples:
+                return self._samples[-1]
+        return self.sample()
+
+    def history(self, n):
+        """최근 n개 샘플 (오래된 것부터)"""
+        with self._lock:
+            n = max(0, min(n, len(self._samples)))
+            return list(self._samples)[len(self._samples) - n:]
+
+    def _loop(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"system sampler error: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='system-sampler', daemon=True)
+            self._thread.start()
@@ -0,0 +1,156 @@
+"""기록된 주사위 상태를 yacht_engine.solve_best_move 로 일괄 분석
+
+입력은 한 줄에 상태 하나인 JSON Lines 이다.
+    {"dice": [3, 3, 5, 2, 3], "rolls_left": 2, "scorecard": [null, 4, ...], "player": "kim", "kept": [1, 1, 0, 0, 1]}
+scorecard 대신 open_categories 를 줘도 되고, player/kept(또는 keep_indices)는 사람의 선택과 비교할 때만 필요하다.
+
+입력을 chunk 단위로 읽어 프로세스 풀에 넘기고, 결과는 입력 순서대로 한 줄씩 출력한다.
+동시에 처리 중인 chunk 수를 제한하므로 입력이 아무리 커도 메모리 사용량은 일정하다.
+
+    python tools/analyze_states.py states.jsonl -o results.jsonl
+    python tools/analyze_states.py states.jsonl --compare --workers 8 > /dev/null
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import yacht_engine  # noqa: E402
+
+
+def _human_keep(state):
+    if 'keep_indices' in state:
+        return sorted(state['keep_indices'])
+    kept = state.get('kept')
+    if kept is not None:
+        return [i for i, k in enumerate(kept) if k]
+    return None
+
+
+def analyze_chunk(start, lines):
+    """워커 프로세스에서 실행: 줄 번호 start 부터의 원본 줄들을 분석한 결과 dict 목록"""
+    results = []
+    for n, line in enumerate(lines, start):
+        if not line.strip():
+            continue
+        try:
+            state = json.loads(line)
+            dice = state['dice']
+            rolls_left = state['rolls_left']
+            if 'open_categories' in state:
+                open_categories = state['open_categories']
+            else:
+                open_categories = [i for i, score in enumerate(state['scorecard']) if score is None]
+            best = yacht_engine.solve_best_move(dice, rolls_left, open_categories)
+            result = {
+                'line': n,
+                'keep_indices': best['keep_indices'],
+                'expected_value': best['expected_value'],
+                'message': best['message'],
+            }
+            human = _human_keep(state)
+            if human is not None:
+                result['player'] = state.get('player')
+                result['human_keep'] = human
+                result['match'] = human == sorted(best['keep_indices'])
+        except Exception as e:
+            result = {'line': n, 'error': f'{type(e).__name__}: {e}'}
+        results.append(result)
+    return results
+
+
+class KeepQuality:
+    """플레이어별 사람 Keep vs 엔진 Keep 비교 집계"""
+
+    def __init__(self):
+        self.players = {}  # player → [states, 일치 수, 겹침(Jaccard) 합]
+
+    def add(self, result):
+        if 'human_keep' not in result:
+            return
+        row = self.players.setdefault(result.get('player') or '?', [0, 0, 0.0])
+        human, engine = set(result['human_keep']), set(result['keep_indices'])
+        row[0] += 1
+        row[1] += result['match']
+        row[2] += len(human & engine) / len(human | engine) if human | engine else 1.0
+
+    def summary(self):
+        return {
+            player: {'states': n, 'match_rate': round(matched / n, 4), 'overlap': round(overlap / n, 4)}
+            for player, (n, matched, overlap) in sorted(self.players.items())
+        }
+
+
+def run(infile, outfile, workers, chunk_size, quality=None, progress=None):
+    """infile 의 모든 줄을 분석해 outfile 에 순서대로 쓰고 (상태 수, 오류 수) 반환"""
+    total = errors = 0
+    pending = deque()
+    max_pending = workers * 4
+    line_no = 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def drain(limit):
+            nonlocal total, errors
+            while len(pending) > limit:
+                for result in pending.popleft().result():
+                    total += 1
+                    errors += 'error' in result
+                    if quality is not None:
+                        quality.add(result)
+                    outfile.write(json.dumps(result, ensure_ascii=False) + '\n')
+                if progress:
+                    progress(total)
+
+        while True:
+            lines = list(islice(infile, chunk_size))
+            if not lines:
+                break
+            pending.append(pool.submit(analyze_chunk, line_no, lines))
+            line_no += len(lines)
+            drain(max_pending - 1)
+        drain(0)
+    return total, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='기록된 주사위 상태 일괄 분석')
+    parser.add_argument('input', help="JSON Lines 상태 파일 ('-' 이면 표준 입력)")
+    parser.add_argument('-o', '--out', help='결과 JSON Lines 경로 (생략 시 표준 출력)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='프로세스 수')
+    parser.add_argument('--chunk', type=int, default=256, help='한 번에 워커에 넘기는 줄 수')
+    parser.add_argument('--compare', action='store_true', help='사람 Keep 과 엔진 Keep 을 플레이어별로 비교')
+    args = parser.parse_args()
+
+    infile = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    outfile = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    quality = KeepQuality() if args.compare else None
+    start = time.perf_counter()
+
+    def progress(n):
+        elapsed = time.perf_counter() - start
+        print(f'\r{n} states, {n / elapsed:,.0f} states/s', end='', file=sys.stderr)
+
+    try:
+        total, errors = run(infile, outfile, args.workers, args.chunk, quality, progress)
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+        if infile is not sys.stdin:
+            infile.close()
+    elapsed = time.perf_counter() - start
+    print(f'\r{total} states ({errors} errors) in {elapsed:.1f}s, {total / max(elapsed, 1e-9):,.0f} states/s',
+          file=sys.stderr)
+
+    if quality is not None:
+        print(f"{'player':<20}{'states':>10}{'match':>10}{'overlap':>10}", file=sys.stderr)
+        for player, row in quality.summary().items():
+            print(f"{player:<20}{row['states']:>10}{row['match_rate']:>10.1%}{row['overlap']:>10.1%}",
+                  file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
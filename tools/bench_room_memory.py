@@ -0,0 +1,72 @@
+"""방 하나당 메모리 사용량 비교 (dict 방식 vs room_state 슬롯 객체)
+
+게임이 중간쯤 진행된 2인 방을 N개 만들고 tracemalloc 으로 방 하나당 바이트 수를 잰다.
+before 는 이전 서버가 들고 있던 dict/list 모양(Room.to_dict() 와 같고 players 리스트를 state 와 공유),
+after 는 room_state.Room 객체다.
+
+    python tools/bench_room_memory.py
+    python tools/bench_room_memory.py --rooms 1000,10000,100000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from room_state import GameState, Room, dice_array, scorecard_array  # noqa: E402
+
+
+def make_room(i, rng):
+    """6턴쯤 진행된 방 (점수판 절반, 마지막 굴림 결과와 keep 이 남아 있음)"""
+    host, guest = f'host{i}', f'guest{i}'
+    players = (host, guest)
+    now = 1700000000.0 + i
+    state = GameState.new_game(players, turn_start_time=now, version=1, updated_by='system')
+    player_states = dict(state.player_states)
+    for name in players:
+        card = [rng.randint(0, 30) if c < 6 else None for c in range(12)]
+        dice = dice_array([rng.randint(1, 6) for _ in range(5)])
+        kept = dice_array([rng.randint(0, 1) for _ in range(5)])
+        player_states[name] = player_states[name].replace(dice=dice, kept=kept, rolls_left=rng.randint(0, 2),
+                                                          scores=scorecard_array(card))
+    turn = player_states[host]
+    state = state.replace(player_states=player_states, dice=turn.dice, kept=turn.kept, rolls_left=turn.rolls_left,
+                          version=rng.randint(10, 60), updated_by=host)
+    return Room(host, players, state, now, player_last_seen={host: now, guest: now})
+
+
+def as_dict(room):
+    d = room.to_dict()
+    d['state']['players'] = d['players']
+    return d
+
+
+def measure(n, build):
+    """build(i) 로 n 개를 만들어 보관하는 데 늘어난 바이트 / n"""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description='방 하나당 메모리 사용량 (dict vs 슬롯 객체)')
+    parser.add_argument('--rooms', default='1000,10000,100000', help='쉼표로 구분한 방 수')
+    args = parser.parse_args()
+
+    print(f"{'rooms':>10}{'before B/room':>16}{'after B/room':>16}{'saved':>10}")
+    for n in [int(x) for x in args.rooms.split(',')]:
+        # 같은 시드로 같은 방들을 만들되 만드는 데 쓴 객체는 측정에서 뺀다
+        before = measure(n, lambda i, rng=random.Random(n): as_dict(make_room(i, rng)))
+        after = measure(n, lambda i, rng=random.Random(n): make_room(i, rng))
+        print(f'{n:>10}{before:>16,.0f}{after:>16,.0f}{1 - after / before:>10.0%}')
+
+
+if __name__ == '__main__':
+    main()
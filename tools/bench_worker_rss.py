@@ -0,0 +1,133 @@
+"""워커 프로세스 수별 메모리 사용량 비교 (엔진 테이블: dict/list 방식 vs 공유 mmap)
+
+마스터가 테이블을 준비한 뒤 (--no-preload 면 각 워커가 직접) N 개 워커를 fork 하고,
+워커마다 테이블 전체를 한 번씩 읽고 gc 를 돌린 다음 모두 살아 있는 상태에서 /proc/self/smaps_rollup 을 읽는다.
+    RSS: 워커가 매핑한 물리 메모리 (공유 페이지 포함)
+    PSS: 공유 페이지를 공유하는 프로세스 수로 나눈 값 (워커 수를 곱하면 실제 총 사용량)
+    USS: 그 워커만 쓰는 페이지 (Private_Clean + Private_Dirty)
+before 는 이전 yacht_engine 과 같은 SCORE_TABLE(dict of dict)/OUTCOMES_CACHE(list of list)를 추가로 들고 있고,
+after 는 yacht_engine 이 mmap 한 engine_tables 버퍼만 쓴다. 두 경우 모두 yacht_engine 을 import 한다. (Linux 전용)
+
+    python tools/bench_worker_rss.py
+    python tools/bench_worker_rss.py --workers 1,4,16 --no-preload
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import yacht_engine  # noqa: E402
+
+
+def legacy_tables():
+    """이전 yacht_engine 이 import 시점에 만들던 테이블"""
+    score_table = {}
+    for d in itertools.combinations_with_replacement(range(1, 7), 5):
+        score_table[d] = {}
+        for cat_idx in yacht_engine.CATS.values():
+            score_table[d][cat_idx] = yacht_engine._calc_score_internal(d, cat_idx)
+    outcomes = {}
+    for k in range(1, 6):
+        counts = Counter()
+        for out in itertools.product(range(1, 7), repeat=k):
+            counts[tuple(sorted(out))] += 1
+        outcomes[k] = [(list(out), cnt / 6 ** k) for out, cnt in counts.items()]
+    return score_table, outcomes
+
+
+def build(mode):
+    if mode == 'before':
+        return legacy_tables()
+    return yacht_engine.TABLES
+
+
+def touch(mode, tables):
+    """요청 처리 중 테이블을 읽는 것처럼 모든 항목을 한 번씩 읽음"""
+    total = 0
+    if mode == 'before':
+        score_table, outcomes = tables
+        for row in score_table.values():
+            for score in row.values():
+                total += score
+        for k, probs in outcomes.items():
+            for out, prob in probs:
+                total += len(out) * prob
+    else:
+        total += sum(tables.scores)
+        for k in range(1, 6):
+            codes, probs = tables.outcomes(k)
+            total += sum(codes) + sum(probs)
+    return total
+
+
+def smaps_rollup():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)}
+
+
+def run(mode, workers, preload):
+    """워커별 {'rss', 'pss', 'uss'} (kB) 목록"""
+    tables = build(mode) if preload else None
+    ready_r, ready_w = os.pipe()
+    go_r, go_w = os.pipe()
+    result_r, result_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            os.close(go_w)
+            os.close(result_r)
+            mine = tables if preload else build(mode)
+            touch(mode, mine)
+            gc.collect()
+            os.write(ready_w, b'.')
+            os.read(go_r, 1)  # 모든 워커가 준비될 때까지 대기 (PSS 는 살아 있는 프로세스끼리 나눔)
+            os.write(result_w, (json.dumps(smaps_rollup()) + '\n').encode())
+            os._exit(0)
+        pids.append(pid)
+    os.close(ready_w)
+    os.close(go_r)
+    os.close(result_w)
+    got = 0
+    while got < workers:
+        got += len(os.read(ready_r, workers))
+    os.write(go_w, b'.' * workers)
+    with os.fdopen(result_r) as f:
+        results = [json.loads(line) for line in f]
+    for pid in pids:
+        os.waitpid(pid, 0)
+    os.close(ready_r)
+    os.close(go_w)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='워커 수별 RSS/PSS/USS (엔진 테이블 dict 방식 vs 공유 mmap)')
+    parser.add_argument('--workers', default='1,4,16', help='쉼표로 구분한 워커 수')
+    parser.add_argument('--no-preload', action='store_true', help='마스터가 아니라 각 워커가 테이블 준비')
+    args = parser.parse_args()
+
+    preload = not args.no_preload
+    print(f"preload={preload}, tables={yacht_engine.TABLES.path or '(not shared)'}")
+    print(f"{'workers':>8}{'mode':>8}{'RSS kB':>10}{'PSS kB':>10}{'USS kB':>10}{'total PSS kB':>14}")
+    for n in [int(x) for x in args.workers.split(',')]:
+        for mode in ('before', 'after'):
+            results = run(mode, n, preload)
+            avg = {key: sum(r[key] for r in results) / n for key in ('rss', 'pss', 'uss')}
+            total = sum(r['pss'] for r in results)
+            print(f"{n:>8}{mode:>8}{avg['rss']:>10,.0f}{avg['pss']:>10,.0f}{avg['uss']:>10,.0f}{total:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""로비/멀티 게임 트래픽 재현 부하 발생기
+
+실제 템플릿의 호출 주기를 그대로 흉내 낸다.
+- 로비 클라이언트 (lobby.html): online-users / rooms / system-status 3초마다, heartbeat 10초마다
+- 2인 방 (multi-game.html): 두 플레이어가 1.2초마다 방 상태 폴링,
+  턴 플레이어는 roll → recommend → sync 를 반복하고 굴림을 다 쓰면 턴을 넘긴다
+
+엔드포인트별 처리량, p50/p95/p99 지연, 오류율을 출력하고 JSON으로 저장해 이전 실행과 비교할 수 있다.
+
+    python tools/loadgen.py --lobby 50 --rooms 20 --duration 60 --out before.json
+    python tools/loadgen.py --lobby 50 --rooms 20 --duration 60 --compare before.json
+    python tools/loadgen.py --url http://127.0.0.1:8080 --lobby 200 --rooms 100
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stress_rooms import HttpClient  # noqa: E402
+
+LOBBY_POLL = 3.0
+HEARTBEAT = 10.0
+ROOM_POLL = 1.2
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}  # endpoint → [ms, ...]
+        self.errors = {}
+
+    def record(self, endpoint, ms, ok):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(ms)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        result = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            n = len(values)
+            pick = lambda q: values[min(n - 1, int(q * n))]
+            result[endpoint] = {
+                'requests': n,
+                'rps': round(n / elapsed, 1),
+                'p50_ms': round(pick(0.50), 2),
+                'p95_ms': round(pick(0.95), 2),
+                'p99_ms': round(pick(0.99), 2),
+                'error_rate': round(self.errors.get(endpoint, 0) / n, 4),
+            }
+        return result
+
+
+class LoadGenerator:
+    def __init__(self, make_client, n_lobby, n_rooms, workers):
+        self.make_client = make_client
+        self.n_lobby = n_lobby
+        self.n_rooms = n_rooms
+        self.stats = Stats()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self._local = threading.local()
+        self._heap = []
+        self._heap_lock = threading.Lock()
+        self._seq = itertools.count()
+        self._stop_at = 0
+
+    # --- 요청/스케줄링 ---
+    def _client(self):
+        c = getattr(self._local, 'client', None)
+        if c is None:
+            c = self._local.client = self.make_client()
+        return c
+
+    def _call(self, endpoint, method, path, body=None):
+        start = time.perf_counter()
+        try:
+            c = self._client()
+            r = c.get(path) if method == 'GET' else c.post(path, json=body)
+            ok = r.status_code < 500
+            data = r.json if ok else None
+        except Exception:
+            ok, data = False, None
+        self.stats.record(endpoint, (time.perf_counter() - start) * 1000, ok)
+        return data if ok else None
+
+    def _schedule(self, when, fn):
+        with self._heap_lock:
+            heapq.heappush(self._heap, (when, next(self._seq), fn))
+
+    def _every(self, period, fn, offset):
+        def tick():
+            fn()
+            self._schedule(time.time() + period, lambda: self.pool.submit(tick))
+        self._schedule(time.time() + offset, lambda: self.pool.submit(tick))
+
+    # --- 시나리오 ---
+    def _lobby_client(self, i):
+        cid = f'load-{i}-{random.getrandbits(32):08x}'
+        name = f'lobby{i}'
+
+        def poll():
+            self._call('GET /api/online-users', 'GET', '/api/online-users')
+            self._call('GET /api/rooms', 'GET', '/api/rooms')
+            self._call('GET /api/system-status', 'GET', '/api/system-status')
+
+        def heartbeat():
+            self._call('POST /api/lobby-heartbeat', 'POST', '/api/lobby-heartbeat',
+                       {'client_id': cid, 'username': name})
+
+        self._every(LOBBY_POLL, poll, random.uniform(0, LOBBY_POLL))
+        self._every(HEARTBEAT, heartbeat, random.uniform(0, HEARTBEAT))
+
+    def _room(self, i):
+        host, guest = f'host{i}', f'guest{i}'
+        created = self._call('POST /api/rooms', 'POST', '/api/rooms', {'username': host})
+        if not created:
+            return
+        code = created['code']
+        self._call('POST /api/rooms/<code>/join', 'POST', f'/api/rooms/{code}/join', {'username': guest})
+        game = {
+            'turn': host,
+            'rolls_left': 3,
+            'kept': [0] * 5,
+            'scores': {host: [None] * 12, guest: [None] * 12},
+        }
+        lock = threading.Lock()
+
+        def poll(player):
+            self._call('GET /api/rooms/<code>', 'GET', f'/api/rooms/{code}?u={player}')
+
+        def turn():
+            with lock:
+                player = game['turn']
+                other = guest if player == host else host
+                r = self._call('POST /api/rooms/<code>/roll', 'POST', f'/api/rooms/{code}/roll',
+                               {'username': player, 'kept': game['kept']})
+                if not r or 'dice' not in r:
+                    return
+                dice, game['rolls_left'] = r['dice'], r['rolls_left']
+                card = game['scores'][player]
+                rec = self._call('POST /api/recommend', 'POST', '/api/recommend',
+                                 {'dice': dice, 'rolls_left': game['rolls_left'], 'scorecard': card})
+                keep = set((rec or {}).get('keep_indices') or [])
+                game['kept'] = [1 if k in keep else 0 for k in range(5)]
+                payload = {'username': player, 'dice': dice, 'kept': game['kept'],
+                           'rolls_left': game['rolls_left'], 'turn': player,
+                           'scores': game['scores'], 'game_over': False}
+                if game['rolls_left'] == 0:
+                    # 첫 빈 칸에 기록하고 턴 넘김, 점수판이 다 차면 새로 시작
+                    open_cats = [k for k, v in enumerate(card) if v is None]
+                    if open_cats:
+                        card[open_cats[0]] = 0
+                    if all(v is not None for c in game['scores'].values() for v in c):
+                        game['scores'] = {host: [None] * 12, guest: [None] * 12}
+                    game.update(turn=other, rolls_left=3, kept=[0] * 5)
+                    payload.update(turn=other, rolls_left=3, kept=[0] * 5, scores=game['scores'])
+                self._call('POST /api/rooms/<code>/sync', 'POST', f'/api/rooms/{code}/sync', payload)
+
+        self._every(ROOM_POLL, lambda: poll(host), random.uniform(0, ROOM_POLL))
+        self._every(ROOM_POLL, lambda: poll(guest), random.uniform(0, ROOM_POLL))
+        self._every(ROOM_POLL, turn, random.uniform(0, ROOM_POLL))
+
+    def run(self, duration):
+        for i in range(self.n_rooms):
+            self._room(i)
+        for i in range(self.n_lobby):
+            self._lobby_client(i)
+        self.stats = Stats()  # 방 생성 등 준비 요청은 집계에서 제외
+        start = time.time()
+        self._stop_at = start + duration
+        while time.time() < self._stop_at:
+            with self._heap_lock:
+                due = []
+                while self._heap and self._heap[0][0] <= time.time():
+                    due.append(heapq.heappop(self._heap)[2])
+                wait = (self._heap[0][0] - time.time()) if self._heap else 0.05
+            for fn in due:
+                fn()
+            time.sleep(min(max(wait, 0.001), 0.05))
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        return self.stats.summary(time.time() - start)
+
+
+def print_report(summary, baseline=None):
+    cols = ('requests', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'error_rate')
+    print(f"{'endpoint':<32}" + ''.join(f'{c:>16}' for c in cols))
+    for endpoint, row in summary.items():
+        cells = []
+        for c in cols:
+            cell = f'{row[c]}'
+            if baseline and endpoint in baseline and c != 'requests':
+                before = baseline[endpoint][c]
+                if before:
+                    cell += f' ({(row[c] - before) / before * 100:+.0f}%)'
+            cells.append(f'{cell:>16}')
+        print(f'{endpoint:<32}' + ''.join(cells))
+    total = sum(r['requests'] for r in summary.values())
+    total_rps = sum(r['rps'] for r in summary.values())
+    print(f"{'TOTAL':<32}{total:>16}{total_rps:>16.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Yacht 로비/게임 트래픽 부하 발생기')
+    parser.add_argument('--lobby', type=int, default=20, help='로비 클라이언트 수')
+    parser.add_argument('--rooms', type=int, default=10, help='2인 방 수')
+    parser.add_argument('--duration', type=float, default=30.0, help='측정 시간 (초)')
+    parser.add_argument('--workers', type=int, default=32, help='요청을 보내는 스레드 수')
+    parser.add_argument('--url', help='실행 중인 서버 주소 (생략 시 같은 프로세스에서 실행)')
+    parser.add_argument('--out', help='결과 JSON 저장 경로')
+    parser.add_argument('--compare', help='비교할 이전 결과 JSON')
+    args = parser.parse_args()
+    out = os.path.abspath(args.out) if args.out else None
+    compare = os.path.abspath(args.compare) if args.compare else None
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        # game_data.json을 건드리지 않도록 임시 디렉터리에서 실행
+        os.chdir(tempfile.mkdtemp(prefix='yacht-load-'))
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        import server
+        make_client = server.app.test_client
+
+    gen = LoadGenerator(make_client, args.lobby, args.rooms, args.workers)
+    summary = gen.run(args.duration)
+
+    baseline = None
+    if compare:
+        with open(compare, encoding='utf-8') as f:
+            baseline = json.load(f)['endpoints']
+    print_report(summary, baseline)
+
+    if out:
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'endpoints': summary}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""방 API 동시성 스트레스 테스트
+
+여러 스레드가 같은 방들에 roll / sync / get 요청을 섞어 보내고,
+성공한 변경 요청 수와 최종 state version 증가량이 일치하는지(유실 없음) 확인한다.
+스레드 수별 처리량(req/s)도 함께 출력한다.
+
+    python tools/stress_rooms.py --threads 1,2,4,8,16 --rooms 8 --ops 2000
+    python tools/stress_rooms.py --url http://127.0.0.1:8080   # 실행 중인 서버 대상
+
+핸들러가 CPU 위주라 한 프로세스 안에서는 GIL 때문에 처리량이 스레드 수에
+비례해 늘지는 않는다. 여기서 확인하는 것은 스레드가 늘어도 락 경합으로
+처리량이 떨어지지 않는다는 점이다 (방이 다르면 서로 다른 락을 잡는다).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+_dumps = json.dumps
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.json = json.loads(body) if body else None
+
+
+class HttpClient:
+    """test client와 같은 get/post 인터페이스의 최소 HTTP 클라이언트"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def _send(self, req):
+        try:
+            with urllib.request.urlopen(req, timeout=10) as r:
+                return _Response(r.status, r.read())
+        except urllib.error.HTTPError as e:
+            return _Response(e.code, e.read())
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, json=None):
+        body = _dumps(json or {}).encode('utf-8')
+        return self._send(urllib.request.Request(
+            self.base_url + path, data=body, method='POST',
+            headers={'Content-Type': 'application/json'}))
+
+
+def run(make_client, n_threads, n_rooms, ops_per_thread):
+    client = make_client()
+    codes = []
+    for i in range(n_rooms):
+        code = client.post('/api/rooms', json={'username': f'h{i}'}).json['code']
+        client.post(f'/api/rooms/{code}/join', json={'username': f'g{i}'})
+        codes.append(code)
+    start_versions = {c: client.get(f'/api/rooms/{c}').json['state']['version'] for c in codes}
+
+    mutations = {c: 0 for c in codes}
+    counts_lock = threading.Lock()
+    errors = []
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        local = {c: 0 for c in codes}
+        c = make_client()
+        try:
+            for _ in range(ops_per_thread):
+                i = rnd.randrange(n_rooms)
+                code, host = codes[i], f'h{i}'
+                op = rnd.random()
+                if op < 0.4:
+                    r = c.post(f'/api/rooms/{code}/roll', json={'username': host, 'kept': [0] * 5})
+                    if r.status_code == 200:
+                        local[code] += 1
+                    elif r.status_code != 400:
+                        errors.append(r.status_code)
+                elif op < 0.6:
+                    r = c.post(f'/api/rooms/{code}/sync', json={
+                        'username': host, 'dice': [1] * 5, 'kept': [0] * 5,
+                        'rolls_left': 3, 'turn': host,
+                    })
+                    if r.status_code == 200:
+                        local[code] += 1
+                    else:
+                        errors.append(r.status_code)
+                else:
+                    r = c.get(f'/api/rooms/{code}?u={host}')
+                    if r.status_code != 200:
+                        errors.append(r.status_code)
+        except Exception as e:
+            errors.append(repr(e))
+        with counts_lock:
+            for code, n in local.items():
+                mutations[code] += n
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(n_threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    lost = 0
+    for code in codes:
+        version = client.get(f'/api/rooms/{code}').json['state']['version']
+        lost += (start_versions[code] + mutations[code]) - version
+    return n_threads * ops_per_thread / elapsed, lost, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='1,2,4,8,16')
+    parser.add_argument('--rooms', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=2000, help='스레드당 요청 수')
+    parser.add_argument('--url', help='실행 중인 서버 주소 (생략 시 같은 프로세스에서 실행)')
+    args = parser.parse_args()
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        # game_data.json을 건드리지 않도록 임시 디렉터리에서 실행
+        os.chdir(tempfile.mkdtemp(prefix='yacht-stress-'))
+        import server
+        make_client = server.app.test_client
+
+    failed = False
+    print(f"{'threads':>7} {'req/s':>10} {'lost':>5} {'errors':>6}")
+    for n in [int(x) for x in args.threads.split(',')]:
+        rps, lost, errors = run(make_client, n, args.rooms, args.ops)
+        print(f"{n:>7} {rps:>10.0f} {lost:>5} {len(errors):>6}")
+        failed = failed or lost != 0 or bool(errors)
+    if failed:
+        print('FAIL: 유실된 version 증가 또는 오류 응답 발생')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,18 @@
-import itertools
+import os
+import threading
+import zlib
 from collections import Counter
 
+import engine_tables
+from engine_tables import DistributionTables, EngineTables, decode, dice_code
+
 CATS = {
     'Ones': 0, 'Twos': 1, 'Threes': 2, 'Fours': 3, 'Fives': 4, 'Sixes': 5,
     'Choice': 6, '4 of a Kind': 7, 'Full House': 8, 'Small Straight': 9, 'Large Straight': 10, 'Yacht': 11
 }
 
-OUTCOMES_CACHE = {}
 EPS = 1e-12
 
-def get_outcomes_probs(k):
-    if k in OUTCOMES_CACHE: return OUTCOMES_CACHE[k]
-    counts = Counter()
-    for out in itertools.product(range(1, 7), repeat=k):
-        counts[tuple(sorted(out))] += 1
-    total = 6**k
-    probs = [(list(out), cnt / total) for out, cnt in counts.items()]
-    OUTCOMES_CACHE[k] = probs
-    return probs
-
 # --- 점수 계산 최적화 (Pre-calculation) ---
 def _calc_score_internal(dice, category_idx):
     counts = Counter(dice)
@@ -66,15 +60,38 @@ def _calc_score_internal(dice, category_idx):
         
     return 0
 
-SCORE_TABLE = {}
-# 모든 주사위 조합(252가지)에 대한 점수를 미리 계산하여 캐싱
-for d in itertools.combinations_with_replacement(range(1, 7), 5):
-    SCORE_TABLE[d] = {}
-    for cat_idx in CATS.values():
-        SCORE_TABLE[d][cat_idx] = _calc_score_internal(d, cat_idx)
+# 모든 주사위 배열(6^5가지)의 점수표와 재굴림 결과 분포를 미리 계산해 평탄한 버퍼로 보관
+# 워커 프로세스들이 같은 파일을 mmap 해서 공유한다 (engine_tables.py, YACHT_ENGINE_TABLES="" 이면 공유 안 함)
+_TABLE_TAG = 0
+for _path in (__file__, engine_tables.__file__):
+    with open(_path, 'rb') as _f:
+        _TABLE_TAG = zlib.crc32(_f.read(), _TABLE_TAG)
+_TABLE_TAG = f'{_TABLE_TAG:08x}'
+_TABLE_PATH = os.environ.get('YACHT_ENGINE_TABLES')
+TABLES = EngineTables.load(_calc_score_internal, _TABLE_TAG, _TABLE_PATH)
+SCORE_TABLE = TABLES.scores  # SCORE_TABLE[dice_code(dice) * 12 + category_idx]
+NUM_CATS = 12
+
+def check_dice(dice):
+    """주사위가 1~6 사이 int 5개가 아니면 ValueError (점수표 인덱스가 음수/범위 밖이 되지 않도록)"""
+    if (not isinstance(dice, (list, tuple)) or len(dice) != 5
+            or any(type(d) is not int or d not in (1, 2, 3, 4, 5, 6) for d in dice)):
+        raise ValueError("dice 는 1~6 사이 눈 5개")
 
 def calc_score(dice, category_idx):
-    return SCORE_TABLE[tuple(sorted(dice))][category_idx]
+    return SCORE_TABLE[dice_code(dice) * NUM_CATS + category_idx]
+
+def get_outcomes_probs(k):
+    """k 개를 굴린 결과 [(눈 목록, 확률), ...] (엔진 내부 루프는 outcome 코드를 바로 사용)"""
+    codes, probs = TABLES.outcomes(k)
+    return [(decode(code, k), prob) for code, prob in zip(codes, probs)]
+
+def _outcome_rows(kept_dice, num_reroll):
+    """kept_dice 뒤에 num_reroll 개를 굴린 결과마다 (점수표 행 시작 인덱스, 확률)"""
+    base = dice_code(kept_dice)
+    shift = 6 ** len(kept_dice)
+    codes, probs = TABLES.outcomes(num_reroll)
+    return [((base + code * shift) * NUM_CATS, prob) for code, prob in zip(codes, probs)]
 
 def get_success_probability(kept_dice, category_idx):
     num_reroll = 5 - len(kept_dice)
@@ -82,9 +99,8 @@ def get_success_probability(kept_dice, category_idx):
         return 1.0 if calc_score(kept_dice, category_idx) > 0 else 0.0
     
     success_prob = 0
-    for outcome, prob in get_outcomes_probs(num_reroll):
-        next_dice = kept_dice + outcome
-        if calc_score(next_dice, category_idx) > 0:
+    for row, prob in _outcome_rows(kept_dice, num_reroll):
+        if SCORE_TABLE[row + category_idx] > 0:
             success_prob += prob
     return success_prob
 
@@ -94,9 +110,8 @@ def get_category_expected_value(kept_dice, category_idx, num_reroll):
         return float(calc_score(kept_dice, category_idx))
     
     ev = 0
-    for outcome, prob in get_outcomes_probs(num_reroll):
-        next_dice = kept_dice + outcome
-        score = calc_score(next_dice, category_idx)
+    for row, prob in _outcome_rows(kept_dice, num_reroll):
+        score = SCORE_TABLE[row + category_idx]
         ev += prob * score
     return ev
 
@@ -123,6 +138,7 @@ def _find_4kind_keeps(dice):
     return candidates
 
 def solve_best_move(dice, rolls_left, open_categories):
+    check_dice(dice)
     # 1. 기본 EV 계산 (점수형 카테고리나 족보 실패 시를 대비한 베이스라인)
     best_ev = -1
     best_keep_indices = []
@@ -144,11 +160,10 @@ def solve_best_move(dice, rolls_left, open_categories):
             ev = current_score
         else:
             ev = 0
-            for outcome, prob in get_outcomes_probs(num_reroll):
-                next_dice = kept_dice + outcome
+            for row, prob in _outcome_rows(kept_dice, num_reroll):
                 max_s = 0
                 for cat in open_categories:
-                    max_s = max(max_s, calc_score(next_dice, cat))
+                    max_s = max(max_s, SCORE_TABLE[row + cat])
                 ev += prob * max_s
         
         if ev > best_ev:
@@ -331,11 +346,10 @@ def solve_best_move(dice, rolls_left, open_categories):
                 strat_ev = max(strat_ev, calc_score(kept_dice, cat))
         else:
             strat_ev = 0
-            for outcome, prob in get_outcomes_probs(num_reroll):
-                next_dice = kept_dice + outcome
+            for row, prob in _outcome_rows(kept_dice, num_reroll):
                 max_s = 0
                 for cat in open_categories:
-                    max_s = max(max_s, calc_score(next_dice, cat))
+                    max_s = max(max_s, SCORE_TABLE[row + cat])
                 strat_ev += prob * max_s
         # 베이스라인 EV보다 낮으면 기본 EV 유지, 아니면 족보 전략 반영
         if strat_ev >= best_ev:
@@ -578,4 +592,124 @@ def solve_best_move(dice, rolls_left, open_categories):
         "dice_recommendations": dice_recommendations,
         "message": rec_msg,
         "breakdown": breakdown
-    }
\ No newline at end of file
+    }
+
+def quick_move(dice, rolls_left, open_categories):
+    """확률 계산 없이 바로 내는 간이 추천 (부하가 높을 때 solve_best_move 대신 사용)"""
+    check_dice(dice)
+    counts = Counter(dice)
+    keep_vals = []
+
+    straight_open = CATS['Small Straight'] in open_categories or CATS['Large Straight'] in open_categories
+    if straight_open:
+        # 연속된 눈이 4개 이상이면 그 눈들을 keep
+        uniq = sorted(set(dice))
+        run = [uniq[0]]
+        best_run = run
+        for v in uniq[1:]:
+            run = run + [v] if v == run[-1] + 1 else [v]
+            if len(run) > len(best_run):
+                best_run = run
+        if len(best_run) >= 4:
+            keep_vals = best_run
+
+    if not keep_vals:
+        # 가장 많이 나온 눈 (동률이면 큰 눈)
+        val, cnt = max(counts.items(), key=lambda kv: (kv[1], kv[0]))
+        if cnt >= 2:
+            keep_vals = [val] * cnt
+
+    keep_indices = []
+    remaining = list(keep_vals)
+    for i, d in enumerate(dice):
+        if d in remaining:
+            keep_indices.append(i)
+            remaining.remove(d)
+
+    if rolls_left <= 0:
+        keep_indices = list(range(5))
+    kept_vals = [str(dice[i]) for i in keep_indices]
+    return {
+        "keep_indices": keep_indices,
+        "expected_value": None,
+        "dice_recommendations": [
+            {"index": i, "value": dice[i], "action": "keep" if i in keep_indices else "reroll", "confidence": 50}
+            for i in range(5)
+        ],
+        "message": f"[{', '.join(kept_vals)}] Keep (간이 추천)" if kept_vals else "모두 굴리기 (간이 추천)",
+        "breakdown": [],
+    }
+
+
+# --- 점수 분포 분석 ---
+CAT_NAMES = {idx: name for name, idx in CATS.items()}
+_dist_tables = None
+_dist_lock = threading.Lock()
+
+def distribution_tables():
+    """analyze() 용 분포 테이블 (처음 호출할 때 만들거나 공유 파일을 연다)"""
+    global _dist_tables
+    if _dist_tables is None:
+        with _dist_lock:
+            if _dist_tables is None:
+                path = _TABLE_PATH + '.dist' if _TABLE_PATH else _TABLE_PATH
+                _dist_tables = DistributionTables.load(TABLES, _TABLE_TAG, path)
+    return _dist_tables
+
+def _category_stats(values, hist, category_idx):
+    ev = ex2 = 0.0
+    histogram = []
+    for v, p in zip(values, hist):
+        if p > EPS:
+            ev += v * p
+            ex2 += v * v * p
+            histogram.append([v, round(p, 6)])
+    return {
+        "category": category_idx,
+        "name": CAT_NAMES[category_idx],
+        "expected_value": round(ev, 4),
+        "variance": round(max(ex2 - ev * ev, 0.0), 4),
+        "histogram": histogram,
+    }
+
+def analyze(dice, rolls_left, open_categories, keep_indices=None):
+    """keep 별로 열린 카테고리마다 최종 점수의 기대값/분산/분포
+
+    keep_indices 를 남기고 나머지를 굴린 뒤, 남은 굴림은 그 카테고리만 노리고 최선으로 쓴다고 가정한다.
+    rolls_left 가 0 이거나 5개를 모두 남기면 지금 주사위 점수가 그대로 최종 점수다.
+    keep_indices 가 None 이면 가능한 32가지 keep 전부에 대해 계산한다.
+    """
+    # JSON 값이 그대로 들어오므로 1.0/True 처럼 int 와 같게 비교되는 값도 막음 (type(x) is int)
+    check_dice(dice)
+    if type(rolls_left) is not int or rolls_left not in range(engine_tables.MAX_LEVEL + 1):
+        raise ValueError(f"rolls_left 는 0~{engine_tables.MAX_LEVEL}")
+    if any(type(c) is not int or c not in CAT_NAMES for c in open_categories):
+        raise ValueError("알 수 없는 카테고리")
+    if keep_indices is None:
+        masks = range(32) if rolls_left else [31]
+    else:
+        if (any(type(i) is not int or i not in range(5) for i in keep_indices)
+                or len(set(keep_indices)) != len(keep_indices)):
+            raise ValueError("keep_indices 는 0~4 사이 서로 다른 위치")
+        masks = [sum(1 << i for i in keep_indices)]
+
+    tables = distribution_tables()
+    code = dice_code(dice)
+    by_keep = {}  # 같은 눈 조합을 남기는 keep 은 결과가 같음
+    keeps = []
+    for mask in masks:
+        keep = [j for j in range(5) if mask >> j & 1]
+        kept = sorted(dice[j] for j in keep)
+        key = tuple(kept)
+        if key not in by_keep:
+            categories = []
+            for cat in open_categories:
+                if rolls_left == 0 or len(kept) == 5:
+                    score = SCORE_TABLE[code * NUM_CATS + cat]
+                    categories.append(_category_stats([score], [1.0], cat))
+                else:
+                    hist = tables.hist(rolls_left, tables.keep(kept), cat)
+                    categories.append(_category_stats(tables.values[cat], hist, cat))
+            by_keep[key] = categories
+        keeps.append({"keep_indices": keep, "categories": by_keep[key]})
+    return {"dice": list(dice), "rolls_left": rolls_left, "keeps": keeps}